@@ -0,0 +1,243 @@
+import asyncio
+import bisect
+from collections import deque
+
+from prometheus_client import Counter, Gauge
+
+ADMISSION_REJECTED = Counter(
+    "admission_rejected_total",
+    "Prediction requests shed by the admission controller",
+    ["route", "reason"],
+)
+ADMISSION_QUEUED = Counter(
+    "admission_queued_total",
+    "Prediction requests that had to wait for a concurrency slot",
+    ["route"],
+)
+ADMISSION_CONCURRENCY_LIMIT = Gauge(
+    "admission_concurrency_limit",
+    "Current adaptive limit on concurrent prediction requests",
+    ["route"],
+)
+ADMISSION_IN_FLIGHT = Gauge(
+    "admission_in_flight",
+    "Prediction requests currently being scored",
+    ["route"],
+)
+ADMISSION_QUEUE_LENGTH = Gauge(
+    "admission_queue_length",
+    "Prediction requests waiting for a concurrency slot",
+    ["route"],
+)
+ADMISSION_REJECT_REASONS = ["queue_full", "queue_timeout"]
+ADMISSION_METRICS = [
+    ADMISSION_QUEUED,
+    ADMISSION_CONCURRENCY_LIMIT,
+    ADMISSION_IN_FLIGHT,
+    ADMISSION_QUEUE_LENGTH,
+]
+
+
+class AdmissionController:
+    """Adaptive concurrency limit for one prediction route.
+
+    The limit follows AIMD on the latency of successful requests. The
+    baseline is a low percentile of the last ``window`` samples, so a few
+    unusually fast or slow responses neither set nor move it, while a model
+    that really got slower becomes the new baseline within one window.
+    When a smoothed latency exceeds ``latency_tolerance`` times the
+    baseline the limit shrinks by ``backoff``, at most once per limit's
+    worth of samples so one slow spell is not punished repeatedly. A fast
+    request adds one slot, but only while at least half the limit is in
+    use. Nothing adapts until ``min_samples`` latencies have been seen.
+
+    Requests over the limit wait in a short queue of at most ``max_queue``
+    for up to ``queue_timeout`` seconds. Past that they are rejected, so
+    the caller can shed them at once instead of letting them pile up in
+    the threadpool. Everything runs on the event loop, so no locking is
+    needed.
+    """
+
+    def __init__(
+        self,
+        route="default",
+        initial_limit=16,
+        min_limit=1,
+        max_limit=128,
+        max_queue=32,
+        queue_timeout=0.05,
+        latency_tolerance=2.0,
+        backoff=0.9,
+        window=1000,
+        min_samples=20,
+        baseline_percentile=0.1,
+        smoothing=0.2,
+    ):
+        self.route = route
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.latency_tolerance = latency_tolerance
+        self.backoff = backoff
+        self.min_samples = min_samples
+        self.baseline_percentile = baseline_percentile
+        self.smoothing = smoothing
+        self.in_flight = 0
+        self.baseline_latency = None
+        self.smoothed_latency = None
+        self.window = window
+        self._latencies = deque()
+        # The same samples kept sorted, for the percentile.
+        self._sorted_latencies = []
+        self._samples_since_backoff = 0
+        self._waiters = deque()
+        ADMISSION_CONCURRENCY_LIMIT.labels(route).set(self.concurrency_limit)
+
+    @property
+    def concurrency_limit(self):
+        return max(self.min_limit, int(self.limit))
+
+    @property
+    def idle(self):
+        return self.in_flight == 0 and not self._waiters
+
+    async def acquire(self):
+        if self.in_flight < self.concurrency_limit and not self._waiters:
+            self._admit()
+            return True
+
+        if len(self._waiters) >= self.max_queue:
+            ADMISSION_REJECTED.labels(self.route, "queue_full").inc()
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        ADMISSION_QUEUED.labels(self.route).inc()
+        ADMISSION_QUEUE_LENGTH.labels(self.route).set(len(self._waiters))
+        try:
+            # release() hands its slot straight to the waiter it resolves.
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            ADMISSION_REJECTED.labels(self.route, "queue_timeout").inc()
+            return False
+        except asyncio.CancelledError:
+            # The client went away after being handed a slot; give it back.
+            if waiter.done() and not waiter.cancelled():
+                self.in_flight -= 1
+                self._wake_waiters()
+                ADMISSION_IN_FLIGHT.labels(self.route).set(self.in_flight)
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            ADMISSION_QUEUE_LENGTH.labels(self.route).set(len(self._waiters))
+        return True
+
+    def release(self, latency, in_flight_at_start, sample=True):
+        """Free a slot; only ``sample`` requests count towards the limit.
+
+        Errors such as validation failures return much faster or slower than
+        a prediction, so callers pass ``sample=False`` for them.
+        """
+        self.in_flight -= 1
+        if sample:
+            self._update_limit(latency, in_flight_at_start)
+        self._wake_waiters()
+        ADMISSION_IN_FLIGHT.labels(self.route).set(self.in_flight)
+
+    def _admit(self):
+        self.in_flight += 1
+        ADMISSION_IN_FLIGHT.labels(self.route).set(self.in_flight)
+
+    def _update_limit(self, latency, in_flight_at_start):
+        self._latencies.append(latency)
+        bisect.insort(self._sorted_latencies, latency)
+        if len(self._latencies) > self.window:
+            oldest = self._latencies.popleft()
+            del self._sorted_latencies[bisect.bisect_left(self._sorted_latencies, oldest)]
+        self._samples_since_backoff += 1
+        if self.smoothed_latency is None:
+            self.smoothed_latency = latency
+        else:
+            self.smoothed_latency += (latency - self.smoothed_latency) * self.smoothing
+        if len(self._latencies) < self.min_samples:
+            return
+
+        ordered = self._sorted_latencies
+        self.baseline_latency = ordered[int(len(ordered) * self.baseline_percentile)]
+
+        if self.smoothed_latency > self.baseline_latency * self.latency_tolerance:
+            if self._samples_since_backoff >= self.concurrency_limit:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self._samples_since_backoff = 0
+        elif in_flight_at_start * 2 >= self.concurrency_limit:
+            self.limit = min(self.max_limit, self.limit + 1)
+        ADMISSION_CONCURRENCY_LIMIT.labels(self.route).set(self.concurrency_limit)
+
+    def _wake_waiters(self):
+        while self._waiters and self.in_flight < self.concurrency_limit:
+            waiter = self._waiters.popleft()
+            if waiter.done():
+                continue
+            self._admit()
+            waiter.set_result(True)
+
+
+class AdmissionControllers:
+    """Admission controllers for the prediction routes.
+
+    Each of ``routes`` gets a controller up front that is never dropped;
+    they are route templates, so any request that reaches a prediction
+    handler has one. Finer keys, such as one registered model version,
+    get their own controller on first use, so a slow model or a cold load
+    cannot shrink the limit of another. At most ``max_routes`` of those are
+    kept: idle ones are dropped to make room, along with their metrics, and
+    while none is idle new keys share their ``fallback`` route's controller.
+    """
+
+    def __init__(self, routes=(), max_routes=64, **settings):
+        self.max_routes = max_routes
+        self.settings = settings
+        self._routes = {route: AdmissionController(route=route, **settings) for route in routes}
+        self._controllers = {}
+
+    def __iter__(self):
+        return iter([*self._routes.values(), *self._controllers.values()])
+
+    def get(self, key, fallback=None):
+        """Controller for ``key``, or for the ``fallback`` route at capacity.
+
+        Without a ``fallback`` only the routes given up front are known and
+        any other key raises ``KeyError``.
+        """
+        controller = self._routes.get(key) or self._controllers.get(key)
+        if controller is not None:
+            return controller
+        if fallback is None:
+            raise KeyError(key)
+
+        if len(self._controllers) >= self.max_routes:
+            self._drop_idle()
+        if len(self._controllers) >= self.max_routes:
+            return self._routes[fallback]
+        controller = AdmissionController(route=key, **self.settings)
+        self._controllers[key] = controller
+        return controller
+
+    def _drop_idle(self):
+        for key, controller in list(self._controllers.items()):
+            if controller.idle:
+                del self._controllers[key]
+                remove_metrics(key)
+
+
+def remove_metrics(route):
+    labels = [(metric, (route,)) for metric in ADMISSION_METRICS]
+    labels += [(ADMISSION_REJECTED, (route, reason)) for reason in ADMISSION_REJECT_REASONS]
+    for metric, label_values in labels:
+        try:
+            metric.remove(*label_values)
+        except KeyError:
+            pass
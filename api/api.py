@@ -1,18 +1,40 @@
+import logging
 import os
+import threading
+import time
 
 import pandas as pd
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse
+from prometheus_client import Gauge
 from prometheus_fastapi_instrumentator import Instrumentator
-from mlflow import MlflowClient
-from mlflow.exceptions import MlflowException
-import mlflow.pyfunc
+from starlette.routing import Match
 
-app = FastAPI()
+from admission import AdmissionControllers
+from candidate import (
+    CANARY_ERRORS,
+    CANARY_PREDICTIONS,
+    MODEL_PREDICT_SECONDS,
+    CandidateScorer,
+)
+from drift import DriftMonitor
+from model_cache import (
+    SERVED_MODEL_PREDICT_SECONDS,
+    SERVED_MODEL_PREDICTIONS,
+    ModelCache,
+)
+from prediction_log import PredictionLogger, build_record
 
-# Instrument once at import time so middleware registration happens before startup.
-instrumentator = Instrumentator().instrument(app)
+# mlflow is only needed to resolve and load the model, which happens off the
+# request path, so it is imported lazily inside the functions that use it.
+
+logger = logging.getLogger(__name__)
+
+app = FastAPI()
 
 TARGET_MODEL_NAME = os.getenv("MODEL_NAME", "titanic-classifier")
+# Stage holding the candidate version scored alongside Production.
+CANDIDATE_STAGE = os.getenv("CANDIDATE_STAGE", "Staging")
 
 TITANIC_FEATURES = [
     "pclass",
@@ -26,8 +48,107 @@ TITANIC_FEATURES = [
 
 EMBARKED_DEFAULT = "S"
 
+REFERENCE_PROFILE_PATH = "reference_profile.json"
+DRIFT_DECAY = float(os.getenv("DRIFT_DECAY", "0.999"))
+
+# Number of passes over the synthetic warm-up batch run before reporting ready.
+WARMUP_ITERATIONS = int(os.getenv("WARMUP_ITERATIONS", "3"))
+
+# How often the registry is checked for a newly promoted Production version,
+# and how often a failed startup load is retried.
+MODEL_REFRESH_SECONDS = float(os.getenv("MODEL_REFRESH_SECONDS", "60"))
+MODEL_RETRY_SECONDS = float(os.getenv("MODEL_RETRY_SECONDS", "10"))
+
+MODEL_WARMUP_SECONDS = Gauge(
+    "model_warmup_seconds",
+    "Time spent loading and warming up the served Production model",
+)
+MODEL_READY = Gauge(
+    "model_ready",
+    "Whether the model has been loaded and warmed up (1) or not (0)",
+)
+TIME_TO_FIRST_PREDICTION_SECONDS = Gauge(
+    "time_to_first_prediction_seconds",
+    "Time from process start to the first successful prediction",
+)
+
+prediction_logger = PredictionLogger(
+    log_dir=os.getenv("PREDICTION_LOG_DIR", "prediction_logs"),
+    max_queue_size=int(os.getenv("PREDICTION_LOG_QUEUE_SIZE", "10000")),
+    batch_size=int(os.getenv("PREDICTION_LOG_BATCH_SIZE", "500")),
+    flush_interval=float(os.getenv("PREDICTION_LOG_FLUSH_SECONDS", "1.0")),
+    max_bytes=int(os.getenv("PREDICTION_LOG_MAX_BYTES", str(64 * 1024 * 1024))),
+)
+
+candidate_scorer = CandidateScorer(
+    shadow_fraction=float(os.getenv("SHADOW_FRACTION", "0.1")),
+    canary_fraction=float(os.getenv("CANARY_FRACTION", "0.0")),
+    max_pending=int(os.getenv("SHADOW_MAX_PENDING", "100")),
+)
+
+PREDICT_ROUTE = "/predict/"
+MODEL_PREDICT_ROUTE = "/models/{model_name}/{version}/predict/"
+
+# Each prediction route gets its own adaptive limit and queue, and so does
+# each registered model version once it is loaded; see admission_controller().
+admission_controllers = AdmissionControllers(
+    routes=[PREDICT_ROUTE, MODEL_PREDICT_ROUTE],
+    max_routes=int(os.getenv("ADMISSION_MAX_ROUTES", "64")),
+    initial_limit=int(os.getenv("ADMISSION_INITIAL_LIMIT", "16")),
+    min_limit=int(os.getenv("ADMISSION_MIN_LIMIT", "1")),
+    max_limit=int(os.getenv("ADMISSION_MAX_LIMIT", "128")),
+    max_queue=int(os.getenv("ADMISSION_MAX_QUEUE", "32")),
+    queue_timeout=float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", "0.05")),
+    latency_tolerance=float(os.getenv("ADMISSION_LATENCY_TOLERANCE", "2.0")),
+)
+ADMISSION_RETRY_AFTER_SECONDS = int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "1"))
+
+# Budget for models served through /models/{name}/{version}/predict/; the
+# warmed-up Production model behind /predict/ is held separately.
+MODEL_MEMORY_BUDGET_MB = float(os.getenv("MODEL_MEMORY_BUDGET_MB", "1024"))
+# How long a stage or alias in that path stays mapped to one version number.
+MODEL_RESOLVE_TTL_SECONDS = float(os.getenv("MODEL_RESOLVE_TTL_SECONDS", "60"))
+# How long an unknown model, version or stage keeps answering 404 from memory.
+MODEL_MISS_TTL_SECONDS = float(os.getenv("MODEL_MISS_TTL_SECONDS", "30"))
+
+# The warmed-up Production model and the drift monitor for its training
+# profile, shared by all requests and swapped together under ``model_lock``.
+model_state = {
+    "model": None,
+    "version": None,
+    "drift_monitor": None,
+    "ready": False,
+    "warmup_seconds": None,
+}
+model_lock = threading.Lock()
+first_prediction_state = {"recorded": False}
+# Fallback start for process_age_seconds() where /proc is not available.
+IMPORTED_AT = time.monotonic()
+refresh_state = {"thread": None, "stop": threading.Event()}
+
+
+def process_age_seconds():
+    """Seconds since the OS started this process, interpreter startup included.
+
+    Uses /proc, so the clock starts with the container's main process rather
+    than when this module was imported; elsewhere it counts from the import.
+    """
+    try:
+        with open("/proc/uptime", encoding="ascii") as uptime_file:
+            uptime = float(uptime_file.read().split()[0])
+        with open("/proc/self/stat", encoding="ascii") as stat_file:
+            # The command name may contain spaces, so split after it; the
+            # start time is field 22, in clock ticks after boot.
+            fields = stat_file.read().rsplit(")", 1)[1].split()
+        return uptime - int(fields[19]) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return time.monotonic() - IMPORTED_AT
+
 
 def fetch_latest_model():
+    from mlflow import MlflowClient
+    from mlflow.exceptions import MlflowException
+
     client = MlflowClient()
     try:
         model = client.get_registered_model(TARGET_MODEL_NAME)
@@ -40,30 +161,347 @@ def fetch_latest_model():
     return model.name
 
 
-def fetch_latest_version(model_name):
+def fetch_latest_version(model_name, stage="Production"):
+    """Load a model by stage, or by version number when ``stage`` is one."""
+    import mlflow.pyfunc
+
     try:
-        return mlflow.pyfunc.load_model(model_uri=f"models:/{model_name}/Production")
+        return mlflow.pyfunc.load_model(model_uri=f"models:/{model_name}/{stage}")
+    except Exception as exc:
+        raise RuntimeError(f"Failed to load model 'models:/{model_name}/{stage}'") from exc
+
+
+def fetch_stage_version(model_name, stage="Production"):
+    """Return the version number currently in ``stage``, or None if it is empty."""
+    from mlflow import MlflowClient
+
+    try:
+        versions = MlflowClient().get_latest_versions(model_name, stages=[stage])
     except Exception as exc:
         raise RuntimeError(
-            f"Failed to load model '{model_name}' from Production stage"
+            f"Failed to look up model '{model_name}' in {stage} stage"
         ) from exc
+    return str(versions[0].version) if versions else None
+
+
+def fetch_reference_profile(model):
+    """Load the training profile logged next to the model by ``train()``."""
+    import mlflow.artifacts
+
+    run_id = getattr(getattr(model, "metadata", None), "run_id", None)
+    if not run_id:
+        raise RuntimeError("Model has no source run to load a reference profile from")
+    try:
+        return mlflow.artifacts.load_dict(f"runs:/{run_id}/{REFERENCE_PROFILE_PATH}")
+    except Exception as exc:
+        raise RuntimeError(
+            f"Failed to load reference profile for run '{run_id}'"
+        ) from exc
+
+
+def directory_size(path):
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(path)
+        for name in names
+    )
+
+
+def load_registered_model(model_name, version):
+    """Load any registered model version or stage, sized by its artifacts."""
+    import mlflow.artifacts
+    import mlflow.pyfunc
+
+    model_uri = f"models:/{model_name}/{version}"
+    try:
+        local_path = mlflow.artifacts.download_artifacts(artifact_uri=model_uri)
+        model = mlflow.pyfunc.load_model(local_path)
+    except Exception as exc:
+        raise RuntimeError(f"Failed to load model '{model_uri}'") from exc
+    return model, directory_size(local_path)
+
+
+def resolve_model_version(model_name, version):
+    """Resolve a stage name or ``@alias`` to the version number it points at."""
+    from mlflow import MlflowClient
+
+    if version.startswith("@"):
+        try:
+            return str(
+                MlflowClient().get_model_version_by_alias(model_name, version[1:]).version
+            )
+        except Exception as exc:
+            raise RuntimeError(f"Model '{model_name}' has no alias '{version}'") from exc
+
+    resolved = fetch_stage_version(model_name, version)
+    if resolved is None:
+        raise RuntimeError(f"Model '{model_name}' has no version in {version} stage")
+    return resolved
+
+
+model_cache = ModelCache(
+    load_registered_model,
+    memory_budget_bytes=int(MODEL_MEMORY_BUDGET_MB * 1024 * 1024),
+    resolver=resolve_model_version,
+    resolve_ttl_seconds=MODEL_RESOLVE_TTL_SECONDS,
+    miss_ttl_seconds=MODEL_MISS_TTL_SECONDS,
+)
+
+
+def build_warmup_inputs(input_example=None):
+    """Build a batch of representative inputs covering every category value.
+
+    Rows are derived from the input example logged by ``train()`` when the
+    model carries one, so dtypes match what the model was fitted on.
+    """
+    if isinstance(input_example, pd.DataFrame) and not input_example.empty:
+        base = input_example.iloc[0].to_dict()
+    else:
+        base = {
+            "pclass": 3,
+            "sex": "male",
+            "age": 30.0,
+            "sibsp": 0,
+            "parch": 0,
+            "fare": 15.0,
+            "embarked": EMBARKED_DEFAULT,
+        }
+
+    rows = []
+    for pclass in (1, 2, 3):
+        for sex in ("male", "female"):
+            for embarked in ("S", "C", "Q"):
+                rows.append({**base, "pclass": pclass, "sex": sex, "embarked": embarked})
+    # Exercise the imputers with a missing numeric value as well.
+    rows.append({**base, "age": float("nan")})
+
+    return pd.DataFrame(rows, columns=TITANIC_FEATURES)
+
+
+def warm_up_model(model, iterations=WARMUP_ITERATIONS):
+    warmup_inputs = build_warmup_inputs(getattr(model, "input_example", None))
+    for _ in range(iterations):
+        model.predict(warmup_inputs)
+        # Single-row calls follow a different path than batches in pandas/sklearn.
+        model.predict(warmup_inputs.iloc[:1])
+
+
+def load_and_warm_up(version=None):
+    """Load a Production version, warm it up and swap it in for all requests.
+
+    The version is resolved first and loaded by number, so the model that is
+    served always matches the version recorded for it.
+    """
+    started = time.perf_counter()
+    model_name = fetch_latest_model()
+    if version is None:
+        version = fetch_stage_version(model_name)
+    if version is None:
+        raise RuntimeError(f"Model '{model_name}' has no version in Production stage")
+    model = fetch_latest_version(model_name, stage=version)
+    warm_up_model(model)
+    elapsed = time.perf_counter() - started
+
+    drift_monitor = None
+    try:
+        drift_monitor = DriftMonitor(fetch_reference_profile(model), DRIFT_DECAY)
+    except RuntimeError:
+        logger.warning("Drift monitoring disabled: no reference profile", exc_info=True)
+
+    with model_lock:
+        model_state.update(
+            {
+                "model": model,
+                "version": version,
+                "drift_monitor": drift_monitor,
+                "ready": True,
+                "warmup_seconds": elapsed,
+            }
+        )
+    MODEL_WARMUP_SECONDS.set(elapsed)
+    MODEL_READY.set(1)
+    logger.info(
+        "Model '%s' version %s warmed up in %.3fs", TARGET_MODEL_NAME, version, elapsed
+    )
+    return elapsed
+
+
+def refresh_production_model():
+    """Swap in a newly promoted Production version, or retry a failed load."""
+    version = fetch_stage_version(fetch_latest_model())
+    if model_state["ready"] and version == model_state["version"]:
+        return False
+    load_and_warm_up(version)
+    return True
+
+
+def load_candidate(version=None):
+    if version is None:
+        version = fetch_stage_version(TARGET_MODEL_NAME, CANDIDATE_STAGE)
+    if version is None:
+        raise RuntimeError(f"Model '{TARGET_MODEL_NAME}' has no version in {CANDIDATE_STAGE}")
+    model = fetch_latest_version(TARGET_MODEL_NAME, stage=version)
+    warm_up_model(model)
+    candidate_scorer.model, candidate_scorer.version = model, version
+    logger.info(
+        "Candidate model '%s' version %s (%s) loaded",
+        TARGET_MODEL_NAME,
+        version,
+        CANDIDATE_STAGE,
+    )
+
+
+def refresh_candidate():
+    """Follow the candidate stage: load a new version, or stop once it is empty."""
+    version = fetch_stage_version(TARGET_MODEL_NAME, CANDIDATE_STAGE)
+    if version == candidate_scorer.version:
+        return False
+    if version is None:
+        candidate_scorer.model, candidate_scorer.version = None, None
+        logger.info("No %s candidate left; shadowing and canary stopped", CANDIDATE_STAGE)
+    else:
+        load_candidate(version)
+    return True
+
+
+def refresh_models(stop):
+    """Poll the registry until ``stop`` is set, keeping the served models current."""
+    while True:
+        interval = MODEL_REFRESH_SECONDS if model_state["ready"] else MODEL_RETRY_SECONDS
+        if stop.wait(interval):
+            return
+        try:
+            refresh_production_model()
+        except Exception:
+            logger.warning("Model refresh failed; keeping the current model", exc_info=True)
+        if candidate_scorer.shadow_fraction or candidate_scorer.canary_fraction:
+            try:
+                refresh_candidate()
+            except Exception:
+                logger.warning("Candidate refresh failed", exc_info=True)
+
+
+def get_production():
+    """Return the Production model, its version and drift monitor consistently.
+
+    Before warm-up has succeeded the model is loaded on the request path, and
+    cached so later requests do not load it again.
+    """
+    with model_lock:
+        if model_state["model"] is None:
+            model_state["model"] = fetch_latest_version(fetch_latest_model())
+        return model_state["model"], model_state["version"], model_state["drift_monitor"]
+
+
+def timed_predict(model, input_df):
+    started = time.perf_counter()
+    prediction = model.predict(input_df)
+    return prediction, time.perf_counter() - started
+
+
+def admission_controller(scope):
+    """Admission controller for a request, or None if it is not a prediction.
+
+    Requests are matched against the app's routes, so paths that no handler
+    serves never get a controller. A registered model version that is
+    already loaded gets its own, keyed on the resolved version so a stage
+    and the number it points at share one limit; anything else under
+    ``/models/`` shares the route's controller.
+    """
+    for route in app.router.routes:
+        match, child_scope = route.matches(scope)
+        if match == Match.FULL:
+            break
+    else:
+        return None
+
+    if route.path == PREDICT_ROUTE:
+        return admission_controllers.get(PREDICT_ROUTE)
+    if route.path != MODEL_PREDICT_ROUTE:
+        return None
+
+    model_name = child_scope["path_params"]["model_name"]
+    version = model_cache.cached_version(model_name, child_scope["path_params"]["version"])
+    if version is None or (model_name, version) not in model_cache:
+        return admission_controllers.get(MODEL_PREDICT_ROUTE)
+    return admission_controllers.get(
+        f"/models/{model_name}/{version}/predict/", fallback=MODEL_PREDICT_ROUTE
+    )
+
+
+@app.middleware("http")
+async def admission_control(request: Request, call_next):
+    controller = admission_controller(request.scope)
+    if controller is None:
+        return await call_next(request)
+
+    if not await controller.acquire():
+        return JSONResponse(
+            status_code=429,
+            content={"detail": "Too many prediction requests, retry later"},
+            headers={"Retry-After": str(ADMISSION_RETRY_AFTER_SECONDS)},
+        )
+
+    in_flight = controller.in_flight
+    started = time.perf_counter()
+    succeeded = False
+    try:
+        response = await call_next(request)
+        succeeded = 200 <= response.status_code < 300
+        return response
+    finally:
+        # Only real predictions say anything about model latency.
+        controller.release(
+            time.perf_counter() - started, in_flight, sample=succeeded
+        )
+
+
+# Instrument after the admission middleware is added, so it wraps it and
+# counts shed requests, and before startup, when the middleware stack is built.
+instrumentator = Instrumentator().instrument(app)
 
 
 @app.on_event("startup")
 async def startup():
     instrumentator.expose(app)
+    prediction_logger.start()
+    try:
+        load_and_warm_up()
+    except RuntimeError:
+        # Keep serving so the model can still be loaded lazily once it is
+        # registered; the refresh thread keeps retrying the warm-up.
+        logger.exception("Model warm-up failed; /ready will report not ready")
+    if candidate_scorer.shadow_fraction or candidate_scorer.canary_fraction:
+        try:
+            load_candidate()
+        except RuntimeError:
+            logger.info("No %s candidate to score alongside Production", CANDIDATE_STAGE)
 
+    refresh_state["stop"].clear()
+    refresh_state["thread"] = threading.Thread(
+        target=refresh_models,
+        args=(refresh_state["stop"],),
+        name="model-refresh",
+        daemon=True,
+    )
+    refresh_state["thread"].start()
 
-@app.get("/predict/")
-def model_output(
-    pclass: int,
-    sex: str,
-    age: float,
-    sibsp: int,
-    parch: int,
-    fare: float,
-    embarked: str | None = None,
-):
+
+@app.on_event("shutdown")
+async def shutdown():
+    refresh_state["stop"].set()
+    prediction_logger.stop()
+    candidate_scorer.shutdown()
+
+
+@app.get("/ready")
+def ready():
+    if not model_state["ready"]:
+        raise HTTPException(status_code=503, detail="model is not warmed up yet")
+    return {"ready": True, "warmup_seconds": model_state["warmup_seconds"]}
+
+
+def build_feature_values(pclass, sex, age, sibsp, parch, fare, embarked):
     if embarked is None or not embarked.strip():
         embarked_value = EMBARKED_DEFAULT
     else:
@@ -73,7 +511,7 @@ def model_output(
     if sex_value not in ("male", "female"):
         raise HTTPException(status_code=400, detail="sex must be 'male' or 'female'")
 
-    feature_values = {
+    return {
         "pclass": pclass,
         "sex": sex_value,
         "age": age,
@@ -83,11 +521,84 @@ def model_output(
         "embarked": embarked_value,
     }
 
-    model_name = fetch_latest_model()
-    model = fetch_latest_version(model_name)
+
+@app.get(PREDICT_ROUTE)
+def model_output(
+    pclass: int,
+    sex: str,
+    age: float,
+    sibsp: int,
+    parch: int,
+    fare: float,
+    embarked: str | None = None,
+):
+    feature_values = build_feature_values(pclass, sex, age, sibsp, parch, fare, embarked)
 
     input_df = pd.DataFrame({key: [feature_values[key]] for key in TITANIC_FEATURES})
-    prediction = model.predict(input_df)
+
+    role, prediction, drift_monitor = "production", None, None
+    canary_model = candidate_scorer.use_canary()
+    if canary_model is not None:
+        version = candidate_scorer.version
+        try:
+            prediction, predict_seconds = timed_predict(canary_model, input_df)
+            role = "candidate"
+            CANARY_PREDICTIONS.inc()
+        except Exception:
+            # A broken candidate must not fail the request; Production answers.
+            logger.exception("Candidate model failed a canary request")
+            CANARY_ERRORS.inc()
+    if prediction is None:
+        model, version, drift_monitor = get_production()
+        prediction, predict_seconds = timed_predict(model, input_df)
+    MODEL_PREDICT_SECONDS.labels(role).observe(predict_seconds)
+    prediction_value = int(prediction[0])
+
+    if role == "production":
+        candidate_scorer.shadow(input_df, prediction_value, predict_seconds)
+
+    if not first_prediction_state["recorded"]:
+        first_prediction_state["recorded"] = True
+        TIME_TO_FIRST_PREDICTION_SECONDS.set(process_age_seconds())
+
+    # The drift monitor profiles Production, so canary answers stay out of it.
+    if role == "production" and drift_monitor is not None:
+        drift_monitor.update(feature_values, prediction_value)
+    prediction_logger.log(
+        build_record(f"{TARGET_MODEL_NAME}:{role}", feature_values, prediction_value, version)
+    )
+
+    return {"survived": prediction_value}
+
+
+@app.get(MODEL_PREDICT_ROUTE)
+def registered_model_output(
+    model_name: str,
+    version: str,
+    pclass: int,
+    sex: str,
+    age: float,
+    sibsp: int,
+    parch: int,
+    fare: float,
+    embarked: str | None = None,
+):
+    feature_values = build_feature_values(pclass, sex, age, sibsp, parch, fare, embarked)
+
+    try:
+        version = model_cache.resolve(model_name, version)
+        model = model_cache.get(model_name, version)
+    except RuntimeError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+
+    input_df = pd.DataFrame({key: [feature_values[key]] for key in TITANIC_FEATURES})
+    with SERVED_MODEL_PREDICT_SECONDS.labels(model_name, version).time():
+        prediction = model.predict(input_df)
     prediction_value = int(prediction[0])
+    SERVED_MODEL_PREDICTIONS.labels(model_name, version).inc()
+
+    prediction_logger.log(
+        build_record(f"{model_name}:{version}", feature_values, prediction_value, version)
+    )
 
     return {"survived": prediction_value}
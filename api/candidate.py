@@ -0,0 +1,104 @@
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from prometheus_client import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+MODEL_PREDICT_SECONDS = Histogram(
+    "model_predict_seconds",
+    "Time spent in model.predict",
+    ["role"],
+)
+SHADOW_PREDICTIONS = Counter(
+    "shadow_predictions_total",
+    "Candidate predictions scored in the background, by agreement with Production",
+    ["agreement"],
+)
+SHADOW_SKIPPED = Counter(
+    "shadow_predictions_skipped_total",
+    "Requests not shadowed because the background executor was saturated",
+)
+SHADOW_LATENCY_DELTA_SECONDS = Histogram(
+    "shadow_latency_delta_seconds",
+    "Candidate minus Production predict latency for shadowed requests",
+    buckets=(-0.1, -0.05, -0.01, -0.005, -0.001, 0, 0.001, 0.005, 0.01, 0.05, 0.1),
+)
+CANARY_PREDICTIONS = Counter(
+    "canary_predictions_total",
+    "Requests answered by the candidate model instead of Production",
+)
+CANARY_ERRORS = Counter(
+    "canary_prediction_errors_total",
+    "Canary requests the candidate failed to score, answered by Production instead",
+)
+
+
+class CandidateScorer:
+    """Score a candidate model version next to Production.
+
+    A ``shadow_fraction`` of requests is re-scored by the candidate on a
+    background executor after the Production prediction is known, so the
+    response never waits for it. A ``canary_fraction`` of requests is
+    answered by the candidate directly. Both are no-ops until ``model`` is
+    set; ``version`` records which registered version it is.
+    """
+
+    def __init__(self, shadow_fraction=0.0, canary_fraction=0.0, max_pending=100):
+        self.shadow_fraction = shadow_fraction
+        self.canary_fraction = canary_fraction
+        self.max_pending = max_pending
+        self.model = None
+        self.version = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shadow")
+        self._pending = threading.BoundedSemaphore(max_pending)
+
+    def use_canary(self):
+        """Return the candidate model to answer this request with, or None.
+
+        The model is read once and returned, so a refresh that clears it
+        meanwhile cannot leave the caller holding None.
+        """
+        model = self.model
+        if model is None or random.random() >= self.canary_fraction:
+            return None
+        return model
+
+    def shadow(self, input_df, prediction, primary_seconds):
+        if self.model is None or random.random() >= self.shadow_fraction:
+            return False
+        if not self._pending.acquire(blocking=False):
+            SHADOW_SKIPPED.inc()
+            return False
+        try:
+            self._executor.submit(
+                self._score, self.model, input_df, prediction, primary_seconds
+            )
+        except RuntimeError:
+            # The executor is shut down while the app stops.
+            self._pending.release()
+            return False
+        return True
+
+    def shutdown(self, wait=False):
+        self._executor.shutdown(wait=wait)
+
+    def _score(self, model, input_df, prediction, primary_seconds):
+        try:
+            started = time.perf_counter()
+            candidate_prediction = int(model.predict(input_df)[0])
+            elapsed = time.perf_counter() - started
+        except Exception:
+            logger.exception("Candidate model failed to score a shadowed request")
+            SHADOW_PREDICTIONS.labels("error").inc()
+            return
+        finally:
+            self._pending.release()
+
+        MODEL_PREDICT_SECONDS.labels("candidate").observe(elapsed)
+        SHADOW_LATENCY_DELTA_SECONDS.observe(elapsed - primary_seconds)
+        agreement = "agree" if candidate_prediction == prediction else "disagree"
+        SHADOW_PREDICTIONS.labels(agreement).inc()
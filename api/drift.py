@@ -0,0 +1,118 @@
+import bisect
+import math
+import threading
+
+from prometheus_client import Gauge
+
+# Smoothing for empty bins so PSI stays finite.
+PSI_EPSILON = 1e-4
+OTHER_CATEGORY = "__other__"
+
+FEATURE_DRIFT_PSI = Gauge(
+    "feature_drift_psi",
+    "Population stability index of a feature against the training profile",
+    ["feature"],
+)
+PREDICTION_DRIFT_PSI = Gauge(
+    "prediction_drift_psi",
+    "Population stability index of predictions against the training labels",
+)
+PREDICTION_POSITIVE_RATE = Gauge(
+    "prediction_positive_rate",
+    "Recent share of requests predicted as survived",
+)
+REFERENCE_POSITIVE_RATE = Gauge(
+    "reference_positive_rate",
+    "Share of survivors in the training data",
+)
+
+
+def population_stability_index(expected, actual):
+    psi = 0.0
+    for expected_share, actual_share in zip(expected, actual):
+        expected_share = max(expected_share, PSI_EPSILON)
+        actual_share = max(actual_share, PSI_EPSILON)
+        psi += (actual_share - expected_share) * math.log(actual_share / expected_share)
+    return psi
+
+
+class DriftMonitor:
+    """Track feature and prediction distributions against a reference profile.
+
+    Memory is fixed by the reference profile: numeric features are counted
+    into the training bins and categorical features into the training
+    vocabulary plus an "other" bucket. Counts decay exponentially per
+    request so the gauges follow recent traffic; ``decay=1.0`` keeps
+    cumulative counts instead.
+    """
+
+    def __init__(self, reference_profile, decay=0.999):
+        self.decay = decay
+        self._lock = threading.Lock()
+        self._numeric = {}
+        self._categorical = {}
+
+        for feature, profile in reference_profile.get("numeric", {}).items():
+            self._numeric[feature] = {
+                "bin_edges": list(profile["bin_edges"]),
+                "expected": list(profile["proportions"]),
+                "counts": [0.0] * len(profile["proportions"]),
+            }
+
+        for feature, frequencies in reference_profile.get("categorical", {}).items():
+            categories = list(frequencies) + [OTHER_CATEGORY]
+            self._categorical[feature] = {
+                "index": {category: i for i, category in enumerate(categories)},
+                "expected": list(frequencies.values()) + [0.0],
+                "counts": [0.0] * len(categories),
+            }
+
+        self.reference_positive_rate = float(reference_profile.get("positive_rate", 0.0))
+        self._positive = 0.0
+        self._total = 0.0
+        REFERENCE_POSITIVE_RATE.set(self.reference_positive_rate)
+
+    def update(self, features, prediction):
+        with self._lock:
+            for feature, state in self._numeric.items():
+                value = features.get(feature)
+                if value is None or value != value:
+                    continue
+                self._decay(state["counts"])
+                state["counts"][bisect.bisect_right(state["bin_edges"], value)] += 1
+                FEATURE_DRIFT_PSI.labels(feature).set(self._psi(state))
+
+            for feature, state in self._categorical.items():
+                key = str(features.get(feature))
+                self._decay(state["counts"])
+                state["counts"][state["index"].get(key, state["index"][OTHER_CATEGORY])] += 1
+                FEATURE_DRIFT_PSI.labels(feature).set(self._psi(state))
+
+            self._positive = self._positive * self.decay + (1 if prediction else 0)
+            self._total = self._total * self.decay + 1
+            positive_rate = self._positive / self._total
+            PREDICTION_POSITIVE_RATE.set(positive_rate)
+            PREDICTION_DRIFT_PSI.set(
+                population_stability_index(
+                    [1 - self.reference_positive_rate, self.reference_positive_rate],
+                    [1 - positive_rate, positive_rate],
+                )
+            )
+
+    def feature_psi(self, feature):
+        with self._lock:
+            state = self._numeric.get(feature) or self._categorical[feature]
+            return self._psi(state)
+
+    def _decay(self, counts):
+        if self.decay != 1.0:
+            for i in range(len(counts)):
+                counts[i] *= self.decay
+
+    @staticmethod
+    def _psi(state):
+        total = sum(state["counts"])
+        if not total:
+            return 0.0
+        actual = [count / total for count in state["counts"]]
+        return population_stability_index(state["expected"], actual)
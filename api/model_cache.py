@@ -0,0 +1,200 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from prometheus_client import Counter, Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+MODEL_CACHE_MODELS = Gauge(
+    "model_cache_models",
+    "Registered models currently resident in the API process",
+)
+MODEL_CACHE_BYTES = Gauge(
+    "model_cache_bytes",
+    "Estimated size of the resident registered models",
+)
+MODEL_CACHE_LOADS = Counter(
+    "model_cache_loads_total",
+    "Registered model loads",
+    ["model", "version"],
+)
+MODEL_CACHE_EVICTIONS = Counter(
+    "model_cache_evictions_total",
+    "Registered models evicted to stay within the memory budget",
+    ["model", "version"],
+)
+SERVED_MODEL_PREDICTIONS = Counter(
+    "served_model_predictions_total",
+    "Predictions served per registered model",
+    ["model", "version"],
+)
+SERVED_MODEL_PREDICT_SECONDS = Histogram(
+    "served_model_predict_seconds",
+    "Time spent in model.predict per registered model",
+    ["model", "version"],
+)
+
+
+class ModelCache:
+    """Keep registered models loaded within a memory budget.
+
+    Models are loaded on first use through ``loader(name, version)``, which
+    returns the model and its estimated size in bytes. When the resident set
+    exceeds ``memory_budget_bytes`` the least recently used models are
+    evicted; the model just loaded is always kept, even if it alone exceeds
+    the budget. Concurrent requests for a model that is still loading wait
+    for that load instead of starting another one.
+
+    Entries are keyed by concrete version number. ``resolve`` maps a stage
+    or alias to the number it currently points at through ``resolver``,
+    and remembers the answer for ``resolve_ttl_seconds``, so a promotion is
+    picked up without a registry call on every request.
+
+    Failed resolutions and loads raise ``RuntimeError`` and are remembered
+    for ``miss_ttl_seconds``, so repeated requests for a model that does not
+    exist fail fast instead of reaching the registry each time. At most
+    ``max_misses`` of them are kept, oldest dropped first.
+    """
+
+    def __init__(
+        self,
+        loader,
+        memory_budget_bytes,
+        resolver=None,
+        resolve_ttl_seconds=60,
+        miss_ttl_seconds=30,
+        max_misses=1024,
+    ):
+        self.memory_budget_bytes = memory_budget_bytes
+        self.resolve_ttl_seconds = resolve_ttl_seconds
+        self.miss_ttl_seconds = miss_ttl_seconds
+        self.max_misses = max_misses
+        self._loader = loader
+        self._resolver = resolver
+        self._models = OrderedDict()
+        self._loading = {}
+        self._resolved = {}
+        self._misses = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._models
+
+    @property
+    def total_bytes(self):
+        with self._lock:
+            return sum(size for _, size in self._models.values())
+
+    def resolve(self, name, version):
+        if self._resolver is None or version.isdigit():
+            return version
+        key = (name, version)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._resolved.get(key)
+            if entry is not None and entry[1] > now:
+                return entry[0]
+        self._raise_if_missed(("resolve", name, version))
+
+        try:
+            resolved = self._resolver(name, version)
+        except RuntimeError as exc:
+            self._remember_miss(("resolve", name, version), exc)
+            raise
+        with self._lock:
+            self._resolved[key] = (resolved, now + self.resolve_ttl_seconds)
+        return resolved
+
+    def cached_version(self, name, version):
+        """Like ``resolve``, but None instead of asking the registry."""
+        if self._resolver is None or version.isdigit():
+            return version
+        with self._lock:
+            entry = self._resolved.get((name, version))
+        if entry is None or entry[1] <= time.monotonic():
+            return None
+        return entry[0]
+
+    def get(self, name, version):
+        key = (name, version)
+        model = self._lookup(key)
+        if model is not None:
+            return model
+
+        with self._lock:
+            key_lock = self._loading.setdefault(key, threading.Lock())
+        with key_lock:
+            model = self._lookup(key)
+            if model is not None:
+                return model
+            self._raise_if_missed(("load", name, version))
+
+            try:
+                model, size = self._loader(name, version)
+            except Exception as exc:
+                with self._lock:
+                    self._loading.pop(key, None)
+                if isinstance(exc, RuntimeError):
+                    self._remember_miss(("load", name, version), exc)
+                raise
+            MODEL_CACHE_LOADS.labels(name, version).inc()
+
+            # Publish the model before dropping the load lock, so a request
+            # arriving in between finds one or the other and never reloads.
+            with self._lock:
+                self._models[key] = (model, size)
+                self._loading.pop(key, None)
+                self._evict(keep=key)
+                self._update_gauges()
+            return model
+
+    def _raise_if_missed(self, key):
+        with self._lock:
+            entry = self._misses.get(key)
+            if entry is None:
+                return
+            message, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._misses[key]
+                return
+        raise RuntimeError(message)
+
+    def _remember_miss(self, key, exc):
+        with self._lock:
+            self._misses.pop(key, None)
+            self._misses[key] = (str(exc), time.monotonic() + self.miss_ttl_seconds)
+            while len(self._misses) > self.max_misses:
+                self._misses.popitem(last=False)
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._models.get(key)
+            if entry is None:
+                return None
+            self._models.move_to_end(key)
+            return entry[0]
+
+    def _evict(self, keep):
+        total = sum(size for _, size in self._models.values())
+        while total > self.memory_budget_bytes and len(self._models) > 1:
+            key = next(iter(self._models))
+            if key == keep:
+                break
+            _, size = self._models.pop(key)
+            total -= size
+            MODEL_CACHE_EVICTIONS.labels(*key).inc()
+            logger.info("Evicted model %s version %s (%d bytes)", key[0], key[1], size)
+        if total > self.memory_budget_bytes:
+            logger.warning(
+                "Model %s version %s alone exceeds the %d byte budget",
+                keep[0],
+                keep[1],
+                self.memory_budget_bytes,
+            )
+
+    def _update_gauges(self):
+        MODEL_CACHE_MODELS.set(len(self._models))
+        MODEL_CACHE_BYTES.set(sum(size for _, size in self._models.values()))
@@ -0,0 +1,148 @@
+import json
+import logging
+import os
+import queue
+import socket
+import threading
+import time
+from datetime import datetime, timezone
+
+from prometheus_client import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+PREDICTION_LOG_RECORDS = Counter(
+    "prediction_log_records_total",
+    "Prediction records written to the prediction log",
+)
+PREDICTION_LOG_DROPPED = Counter(
+    "prediction_log_dropped_total",
+    "Prediction records dropped because the log queue was full",
+)
+PREDICTION_LOG_QUEUE_SIZE = Gauge(
+    "prediction_log_queue_size",
+    "Prediction records waiting to be written",
+)
+
+
+class PredictionLogger:
+    """Log request features and predictions to rotating NDJSON files.
+
+    ``log`` only appends to a bounded in-memory queue and never blocks; a
+    background thread drains the queue in batches and does all file I/O.
+    When the queue is full the record is dropped and counted instead.
+    File names carry the hostname and PID, so workers and replicas sharing
+    ``log_dir`` never append to the same file.
+    """
+
+    def __init__(
+        self,
+        log_dir,
+        max_queue_size=10000,
+        batch_size=500,
+        flush_interval=1.0,
+        max_bytes=64 * 1024 * 1024,
+    ):
+        self.log_dir = log_dir
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._stop = threading.Event()
+        self._thread = None
+        self._file = None
+        self._file_index = 0
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        os.makedirs(self.log_dir, exist_ok=True)
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="prediction-logger", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def log(self, record):
+        if not self.running:
+            return False
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            PREDICTION_LOG_DROPPED.inc()
+            return False
+        return True
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._write_batch(self._next_batch())
+        # Drain whatever was queued before shutdown.
+        while not self._queue.empty():
+            self._write_batch(self._next_batch(block=False))
+        self._close_file()
+
+    def _next_batch(self, block=True):
+        batch = []
+        try:
+            if block:
+                batch.append(self._queue.get(timeout=self.flush_interval))
+            while len(batch) < self.batch_size:
+                batch.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def _write_batch(self, batch):
+        PREDICTION_LOG_QUEUE_SIZE.set(self._queue.qsize())
+        if not batch:
+            return
+        payload = "".join(json.dumps(record, default=str) + "\n" for record in batch)
+        try:
+            log_file = self._current_file()
+            log_file.write(payload)
+            log_file.flush()
+        except OSError:
+            logger.exception("Failed to write %d prediction records", len(batch))
+            self._close_file()
+            return
+        PREDICTION_LOG_RECORDS.inc(len(batch))
+
+    def _current_file(self):
+        if self._file is not None and self._file.tell() >= self.max_bytes:
+            self._close_file()
+        if self._file is None:
+            stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+            writer = f"{socket.gethostname()}-{os.getpid()}"
+            self._file_index += 1
+            path = os.path.join(
+                self.log_dir,
+                f"predictions-{stamp}-{writer}-{self._file_index:04d}.ndjson",
+            )
+            self._file = open(path, "a", encoding="utf-8")
+        return self._file
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def build_record(model_name, features, prediction, version=None):
+    return {
+        "timestamp": time.time(),
+        "model": model_name,
+        "version": version,
+        "features": features,
+        "prediction": prediction,
+    }
@@ -0,0 +1,190 @@
+import asyncio
+
+import pytest
+from prometheus_client import REGISTRY
+
+from admission import ADMISSION_REJECTED, AdmissionController, AdmissionControllers
+
+
+def counter_value(counter):
+    return counter._value.get()
+
+
+def release_many(controller, latency, in_flight_at_start, count, sample=True):
+    for _ in range(count):
+        controller.in_flight += 1
+        controller.release(latency, in_flight_at_start, sample=sample)
+
+
+class TestAdmission:
+    """Test admitting, queueing and shedding prediction requests"""
+
+    def test_admits_up_to_limit_then_rejects(self):
+        """Test requests over the limit are rejected once the queue is full"""
+
+        async def scenario():
+            controller = AdmissionController(route="full", initial_limit=2, max_queue=0)
+            results = [await controller.acquire() for _ in range(3)]
+            return controller, results
+
+        rejected = ADMISSION_REJECTED.labels("full", "queue_full")
+        rejected_before = counter_value(rejected)
+        controller, results = asyncio.run(scenario())
+
+        assert results == [True, True, False]
+        assert controller.in_flight == 2
+        assert counter_value(rejected) == rejected_before + 1
+
+    def test_queued_request_gets_released_slot(self):
+        """Test a waiting request is admitted when a slot frees up"""
+
+        async def scenario():
+            controller = AdmissionController(initial_limit=1, max_queue=1, queue_timeout=1)
+            assert await controller.acquire()
+            waiting = asyncio.ensure_future(controller.acquire())
+            await asyncio.sleep(0)
+            controller.release(0.01, 1)
+            return controller, await waiting
+
+        controller, admitted = asyncio.run(scenario())
+
+        assert admitted
+        assert controller.in_flight == 1
+
+    def test_queued_request_times_out(self):
+        """Test a request waiting too long is shed"""
+
+        async def scenario():
+            controller = AdmissionController(
+                route="timeout", initial_limit=1, max_queue=1, queue_timeout=0.01
+            )
+            await controller.acquire()
+            return controller, await controller.acquire()
+
+        timeouts = ADMISSION_REJECTED.labels("timeout", "queue_timeout")
+        timeouts_before = counter_value(timeouts)
+        controller, admitted = asyncio.run(scenario())
+
+        assert not admitted
+        assert controller.in_flight == 1
+        assert counter_value(timeouts) == timeouts_before + 1
+
+
+class TestAdaptiveLimit:
+    """Test the AIMD concurrency limit"""
+
+    def test_slow_requests_shrink_limit(self):
+        """Test latency well above the baseline backs the limit off"""
+        controller = AdmissionController(initial_limit=20, min_limit=2)
+        release_many(controller, 0.01, 1, 100)
+        release_many(controller, 0.1, 20, 200)
+
+        assert controller.concurrency_limit < 10
+        assert controller.concurrency_limit >= 2
+
+    def test_fast_requests_under_load_grow_limit(self):
+        """Test the limit grows while it is in use and latency stays flat"""
+        controller = AdmissionController(initial_limit=4, max_limit=6)
+        release_many(controller, 0.01, 4, 30)
+
+        assert controller.concurrency_limit == 6
+
+    def test_idle_requests_do_not_grow_limit(self):
+        """Test the limit does not grow when it is not being used"""
+        controller = AdmissionController(initial_limit=4)
+        release_many(controller, 0.01, 1, 30)
+
+        assert controller.concurrency_limit == 4
+
+    def test_one_fast_outlier_does_not_set_baseline(self):
+        """Test a single very fast response cannot collapse the limit"""
+        controller = AdmissionController(initial_limit=16)
+        release_many(controller, 0.0003, 1, 1)
+        release_many(controller, 0.01, 1, 200)
+
+        assert controller.concurrency_limit == 16
+        assert controller.baseline_latency == 0.01
+
+    def test_error_responses_are_not_sampled(self):
+        """Test fast errors mixed into normal traffic leave the limit alone"""
+        controller = AdmissionController(initial_limit=16)
+        for _ in range(100):
+            release_many(controller, 0.0003, 1, 2, sample=False)
+            release_many(controller, 0.01, 1, 1)
+
+        assert controller.concurrency_limit == 16
+        assert controller.baseline_latency == 0.01
+        assert controller.in_flight == 0
+
+    def test_baseline_follows_a_slower_model(self):
+        """Test latency that stays higher becomes the baseline within a window"""
+        controller = AdmissionController(initial_limit=16, window=100)
+        release_many(controller, 0.01, 1, 100)
+        release_many(controller, 0.05, 1, 100)
+
+        assert controller.baseline_latency == 0.05
+
+    def test_no_adaptation_before_min_samples(self):
+        """Test a cold start or model load does not move the limit"""
+        controller = AdmissionController(initial_limit=16, min_samples=20)
+        release_many(controller, 0.01, 16, 1)
+        release_many(controller, 5.0, 16, 1)
+
+        assert controller.concurrency_limit == 16
+
+
+class TestAdmissionControllers:
+    """Test per-route admission controllers"""
+
+    def test_routes_have_separate_limits(self):
+        """Test a slow model does not shrink the limit of its route"""
+        controllers = AdmissionControllers(routes=["/predict/", "/models/"], initial_limit=16)
+        fast = controllers.get("/predict/")
+        slow = controllers.get("/models/big/1/predict/", fallback="/models/")
+        release_many(slow, 0.01, 1, 50)
+        release_many(slow, 0.5, 16, 200)
+
+        assert controllers.get("/predict/") is fast
+        assert slow.concurrency_limit < 16
+        assert fast.concurrency_limit == 16
+
+    def test_unknown_keys_need_a_fallback(self):
+        """Test only the configured routes exist without a fallback"""
+        controllers = AdmissionControllers(routes=["/predict/"])
+
+        with pytest.raises(KeyError):
+            controllers.get("/made-up/")
+        assert [controller.route for controller in controllers] == ["/predict/"]
+
+    def test_idle_keys_are_dropped_at_capacity(self):
+        """Test idle keys make room but routes are never dropped"""
+        controllers = AdmissionControllers(routes=["/predict/", "/models/"], max_routes=2)
+        busy = controllers.get("/models/a/1/predict/", fallback="/models/")
+        busy.in_flight = 1
+        controllers.get("/models/b/1/predict/", fallback="/models/")
+        ADMISSION_REJECTED.labels("/models/b/1/predict/", "queue_full").inc()
+        controllers.get("/models/c/1/predict/", fallback="/models/")
+
+        assert {controller.route for controller in controllers} == {
+            "/predict/",
+            "/models/",
+            "/models/a/1/predict/",
+            "/models/c/1/predict/",
+        }
+        assert (
+            REGISTRY.get_sample_value(
+                "admission_rejected_total",
+                {"route": "/models/b/1/predict/", "reason": "queue_full"},
+            )
+            is None
+        )
+
+    def test_busy_capacity_uses_fallback(self):
+        """Test new keys share the fallback route when nothing is idle"""
+        controllers = AdmissionControllers(routes=["/models/"], max_routes=1)
+        controllers.get("/models/a/1/predict/", fallback="/models/").in_flight = 1
+
+        controller = controllers.get("/models/b/1/predict/", fallback="/models/")
+
+        assert controller is controllers.get("/models/")
+        assert len(list(controllers)) == 2
@@ -1,12 +1,49 @@
+import os
+import subprocess
+import sys
+import time
+
 import pytest
 from fastapi.testclient import TestClient
 from unittest.mock import Mock, patch, MagicMock
 import pandas as pd
-from api import app, fetch_latest_model, fetch_latest_version, TITANIC_FEATURES
+from prometheus_client import REGISTRY
+from api import (
+    admission_controllers,
+    app,
+    fetch_latest_model,
+    fetch_latest_version,
+    build_warmup_inputs,
+    candidate_scorer,
+    load_and_warm_up,
+    model_cache,
+    model_state,
+    prediction_logger,
+    process_age_seconds,
+    refresh_candidate,
+    refresh_production_model,
+    TITANIC_FEATURES,
+)
 
 client = TestClient(app)
 
 
+@pytest.fixture(autouse=True)
+def reset_model_state():
+    """Each test starts without a cached Production model."""
+    with patch.dict(
+        model_state,
+        {
+            "model": None,
+            "version": None,
+            "drift_monitor": None,
+            "ready": False,
+            "warmup_seconds": None,
+        },
+    ):
+        yield
+
+
 class TestAPIEndpoints:
     """Test API endpoints"""
 
@@ -154,7 +191,7 @@ class TestAPIEndpoints:
 class TestModelFunctions:
     """Test model loading functions"""
 
-    @patch("api.MlflowClient")
+    @patch("mlflow.MlflowClient")
     def test_fetch_latest_model_success(self, mock_client):
         """Test successful model fetching"""
         mock_model = Mock()
@@ -164,7 +201,7 @@ class TestModelFunctions:
         result = fetch_latest_model()
         assert result == "titanic-classifier"
 
-    @patch("api.MlflowClient")
+    @patch("mlflow.MlflowClient")
     def test_fetch_latest_model_not_found(self, mock_client):
         """Test model not found error"""
         from mlflow.exceptions import MlflowException
@@ -177,7 +214,7 @@ class TestModelFunctions:
             fetch_latest_model()
         assert "not found" in str(exc_info.value)
 
-    @patch("api.mlflow.pyfunc.load_model")
+    @patch("mlflow.pyfunc.load_model")
     def test_fetch_latest_version_success(self, mock_load_model):
         """Test successful model version fetching"""
         mock_model = Mock()
@@ -189,7 +226,7 @@ class TestModelFunctions:
             model_uri="models:/titanic-classifier/Production"
         )
 
-    @patch("api.mlflow.pyfunc.load_model")
+    @patch("mlflow.pyfunc.load_model")
     def test_fetch_latest_version_failure(self, mock_load_model):
         """Test model version fetch failure"""
         mock_load_model.side_effect = Exception("Failed to load model")
@@ -287,3 +324,594 @@ class TestDataValidation:
             },
         )
         assert response.status_code == 200
+
+
+class TestStartupWarmup:
+    """Test model warm-up before accepting traffic"""
+
+    def test_build_warmup_inputs_from_input_example(self):
+        """Test warm-up inputs reuse the logged input example"""
+        input_example = pd.DataFrame(
+            [
+                {
+                    "pclass": 2,
+                    "sex": "female",
+                    "age": 40.0,
+                    "sibsp": 1,
+                    "parch": 1,
+                    "fare": 30.0,
+                    "embarked": "C",
+                }
+            ]
+        )
+
+        warmup_inputs = build_warmup_inputs(input_example)
+
+        assert list(warmup_inputs.columns) == TITANIC_FEATURES
+        assert set(warmup_inputs["pclass"]) == {1, 2, 3}
+        assert set(warmup_inputs["sex"]) == {"male", "female"}
+        assert set(warmup_inputs["embarked"]) == {"S", "C", "Q"}
+        assert warmup_inputs["age"].isna().any()
+        assert (warmup_inputs["fare"] == 30.0).all()
+
+    def test_build_warmup_inputs_without_input_example(self):
+        """Test warm-up inputs fall back to defaults"""
+        warmup_inputs = build_warmup_inputs(None)
+        assert list(warmup_inputs.columns) == TITANIC_FEATURES
+        assert len(warmup_inputs) > 0
+
+    @patch("api.fetch_stage_version", return_value="3")
+    @patch("api.fetch_latest_model")
+    @patch("api.fetch_latest_version")
+    def test_load_and_warm_up_caches_model(
+        self, mock_fetch_version, mock_fetch_model, mock_stage_version
+    ):
+        """Test warm-up runs predictions and marks the service ready"""
+        mock_fetch_model.return_value = "titanic-classifier"
+        mock_model = Mock()
+        mock_model.input_example = None
+        mock_model.metadata.run_id = None
+        mock_model.predict.return_value = [1]
+        mock_fetch_version.return_value = mock_model
+
+        elapsed = load_and_warm_up()
+
+        assert elapsed >= 0
+        assert mock_model.predict.called
+        assert model_state["model"] is mock_model
+        assert model_state["version"] == "3"
+        mock_fetch_version.assert_called_once_with("titanic-classifier", stage="3")
+        assert client.get("/ready").status_code == 200
+
+        # Requests are served by the warmed-up model without reloading it.
+        mock_fetch_version.reset_mock()
+        response = client.get(
+            "/predict/",
+            params={
+                "pclass": 1,
+                "sex": "female",
+                "age": 25.0,
+                "sibsp": 0,
+                "parch": 0,
+                "fare": 50.0,
+            },
+        )
+        assert response.status_code == 200
+        mock_fetch_version.assert_not_called()
+
+    def test_ready_before_warm_up(self):
+        """Test readiness is reported only after warm-up"""
+        response = client.get("/ready")
+        assert response.status_code == 503
+
+    @patch("api.fetch_latest_model")
+    @patch("api.fetch_latest_version")
+    def test_lazily_loaded_model_is_cached(self, mock_fetch_version, mock_fetch_model):
+        """Test a model loaded by a request before warm-up is reused"""
+        mock_fetch_model.return_value = "titanic-classifier"
+        mock_fetch_version.return_value.predict.return_value = [1]
+
+        for _ in range(3):
+            response = client.get(
+                "/predict/",
+                params={
+                    "pclass": 1,
+                    "sex": "female",
+                    "age": 25.0,
+                    "sibsp": 0,
+                    "parch": 0,
+                    "fare": 50.0,
+                },
+            )
+            assert response.status_code == 200
+
+        mock_fetch_version.assert_called_once()
+
+
+class TestModelRefresh:
+    """Test picking up newly promoted Production versions"""
+
+    @patch("api.fetch_stage_version", return_value="4")
+    @patch("api.fetch_latest_model", return_value="titanic-classifier")
+    @patch("api.fetch_latest_version")
+    def test_promoted_version_is_swapped_in(
+        self, mock_fetch_version, mock_fetch_model, mock_stage_version
+    ):
+        """Test a new Production version replaces the served model"""
+        old_model, new_model = Mock(), Mock()
+        new_model.input_example = None
+        new_model.metadata.run_id = None
+        model_state.update({"model": old_model, "version": "3", "ready": True})
+        mock_fetch_version.return_value = new_model
+
+        assert refresh_production_model()
+
+        assert model_state["model"] is new_model
+        assert model_state["version"] == "4"
+        assert new_model.predict.called
+        mock_fetch_version.assert_called_once_with("titanic-classifier", stage="4")
+
+    def test_prediction_records_carry_serving_version(self):
+        """Test logged records say which Production version answered"""
+        model_state.update({"model": Mock(predict=Mock(return_value=[1])), "version": "4"})
+
+        with patch.object(prediction_logger, "log") as mock_log:
+            response = client.get(
+                "/predict/",
+                params={
+                    "pclass": 1,
+                    "sex": "female",
+                    "age": 25.0,
+                    "sibsp": 0,
+                    "parch": 0,
+                    "fare": 50.0,
+                },
+            )
+
+        assert response.status_code == 200
+        record = mock_log.call_args[0][0]
+        assert record["model"] == "titanic-classifier:production"
+        assert record["version"] == "4"
+
+    @patch("api.fetch_stage_version", return_value="3")
+    @patch("api.fetch_latest_model", return_value="titanic-classifier")
+    @patch("api.fetch_latest_version")
+    def test_unchanged_version_is_not_reloaded(
+        self, mock_fetch_version, mock_fetch_model, mock_stage_version
+    ):
+        """Test the registry check is cheap while Production is unchanged"""
+        current_model = Mock()
+        model_state.update({"model": current_model, "version": "3", "ready": True})
+
+        assert not refresh_production_model()
+
+        assert model_state["model"] is current_model
+        mock_fetch_version.assert_not_called()
+
+    @patch("api.fetch_stage_version", return_value="3")
+    @patch("api.fetch_latest_model", return_value="titanic-classifier")
+    @patch("api.fetch_latest_version")
+    def test_failed_warm_up_is_retried(
+        self, mock_fetch_version, mock_fetch_model, mock_stage_version
+    ):
+        """Test a model that never warmed up is loaded by the refresh"""
+        model = Mock()
+        model.input_example = None
+        model.metadata.run_id = None
+        mock_fetch_version.return_value = model
+
+        assert refresh_production_model()
+
+        assert model_state["ready"]
+        assert client.get("/ready").status_code == 200
+
+
+class TestCandidateRouting:
+    """Test canary routing to the candidate model"""
+
+    @patch.object(candidate_scorer, "canary_fraction", 1.0)
+    @patch.object(candidate_scorer, "model")
+    @patch("api.fetch_latest_model")
+    @patch("api.fetch_latest_version")
+    def test_canary_request_uses_candidate(
+        self, mock_fetch_version, mock_fetch_model, mock_candidate
+    ):
+        """Test canary traffic is answered by the candidate model"""
+        mock_candidate.predict.return_value = [0]
+
+        response = client.get(
+            "/predict/",
+            params={
+                "pclass": 3,
+                "sex": "male",
+                "age": 30.0,
+                "sibsp": 0,
+                "parch": 0,
+                "fare": 10.0,
+            },
+        )
+
+        assert response.status_code == 200
+        assert response.json()["survived"] == 0
+        mock_candidate.predict.assert_called_once()
+        mock_fetch_version.assert_not_called()
+
+    @patch.object(candidate_scorer, "shadow_fraction", 1.0)
+    @patch.object(candidate_scorer, "model")
+    @patch("api.fetch_latest_model")
+    @patch("api.fetch_latest_version")
+    def test_production_request_is_shadowed(
+        self, mock_fetch_version, mock_fetch_model, mock_candidate
+    ):
+        """Test Production traffic is also scored by the candidate"""
+        mock_fetch_version.return_value.predict.return_value = [1]
+        mock_candidate.predict.return_value = [1]
+
+        with patch.object(candidate_scorer, "shadow", wraps=candidate_scorer.shadow) as shadow:
+            response = client.get(
+                "/predict/",
+                params={
+                    "pclass": 1,
+                    "sex": "female",
+                    "age": 30.0,
+                    "sibsp": 0,
+                    "parch": 0,
+                    "fare": 80.0,
+                },
+            )
+
+        assert response.status_code == 200
+        assert response.json()["survived"] == 1
+        assert shadow.call_args[0][1] == 1
+
+    @patch.object(candidate_scorer, "canary_fraction", 1.0)
+    @patch.object(candidate_scorer, "model")
+    def test_failing_canary_falls_back_to_production(self, mock_candidate):
+        """Test a candidate error is answered by Production, not a 500"""
+        from candidate import CANARY_ERRORS
+
+        mock_candidate.predict.side_effect = ValueError("bad input")
+        production = Mock(predict=Mock(return_value=[1]))
+        model_state.update({"model": production, "version": "4"})
+        errors_before = CANARY_ERRORS._value.get()
+
+        with patch.object(prediction_logger, "log") as mock_log:
+            response = client.get(
+                "/predict/",
+                params={
+                    "pclass": 1,
+                    "sex": "female",
+                    "age": 30.0,
+                    "sibsp": 0,
+                    "parch": 0,
+                    "fare": 80.0,
+                },
+            )
+
+        assert response.status_code == 200
+        assert response.json()["survived"] == 1
+        production.predict.assert_called_once()
+        assert CANARY_ERRORS._value.get() == errors_before + 1
+        assert mock_log.call_args[0][0]["version"] == "4"
+
+    @patch.object(candidate_scorer, "canary_fraction", 1.0)
+    @patch.object(candidate_scorer, "model")
+    def test_canary_prediction_skips_drift_monitor(self, mock_candidate):
+        """Test candidate answers do not skew the Production drift metrics"""
+        mock_candidate.predict.return_value = [1]
+        drift_monitor = Mock()
+        model_state.update({"model": Mock(), "drift_monitor": drift_monitor})
+
+        response = client.get(
+            "/predict/",
+            params={
+                "pclass": 1,
+                "sex": "female",
+                "age": 30.0,
+                "sibsp": 0,
+                "parch": 0,
+                "fare": 80.0,
+            },
+        )
+
+        assert response.status_code == 200
+        drift_monitor.update.assert_not_called()
+
+    @patch.object(candidate_scorer, "version", "5")
+    @patch.object(candidate_scorer, "model")
+    @patch("api.fetch_stage_version", return_value="6")
+    @patch("api.fetch_latest_version")
+    def test_new_staging_version_is_loaded(
+        self, mock_fetch_version, mock_stage_version, mock_candidate
+    ):
+        """Test a version moved to Staging later becomes the candidate"""
+        new_candidate = Mock()
+        new_candidate.input_example = None
+        mock_fetch_version.return_value = new_candidate
+
+        assert refresh_candidate()
+
+        assert candidate_scorer.model is new_candidate
+        assert candidate_scorer.version == "6"
+        mock_fetch_version.assert_called_once_with("titanic-classifier", stage="6")
+
+    @patch.object(candidate_scorer, "version", "5")
+    @patch.object(candidate_scorer, "model")
+    @patch("api.fetch_stage_version", return_value=None)
+    def test_emptied_staging_stops_candidate(self, mock_stage_version, mock_candidate):
+        """Test shadowing stops once no version is left in Staging"""
+        assert refresh_candidate()
+
+        assert candidate_scorer.model is None
+        assert candidate_scorer.version is None
+
+
+class TestMultiModelServing:
+    """Test serving registered models addressed by name and version"""
+
+    def test_registered_model_prediction(self):
+        """Test a model is loaded lazily and cached by name and version"""
+        mock_model = Mock()
+        mock_model.predict.return_value = [1]
+
+        with patch.object(
+            model_cache, "_loader", return_value=(mock_model, 10)
+        ) as mock_loader:
+            for _ in range(2):
+                response = client.get(
+                    "/models/titanic-segment-a/3/predict/",
+                    params={
+                        "pclass": 1,
+                        "sex": "female",
+                        "age": 30.0,
+                        "sibsp": 0,
+                        "parch": 0,
+                        "fare": 80.0,
+                    },
+                )
+                assert response.status_code == 200
+                assert response.json() == {"survived": 1}
+
+        mock_loader.assert_called_once_with("titanic-segment-a", "3")
+
+    def test_stage_is_served_by_version_number(self):
+        """Test a stage in the path is resolved before the model is cached"""
+        mock_model = Mock()
+        mock_model.predict.return_value = [0]
+
+        with (
+            patch.object(model_cache, "_resolver", return_value="7") as mock_resolver,
+            patch.object(model_cache, "_loader", return_value=(mock_model, 10)) as mock_loader,
+        ):
+            response = client.get(
+                "/models/titanic-segment-b/Production/predict/",
+                params={
+                    "pclass": 1,
+                    "sex": "female",
+                    "age": 30.0,
+                    "sibsp": 0,
+                    "parch": 0,
+                    "fare": 80.0,
+                },
+            )
+
+        assert response.status_code == 200
+        mock_resolver.assert_called_once_with("titanic-segment-b", "Production")
+        mock_loader.assert_called_once_with("titanic-segment-b", "7")
+
+    def test_unknown_registered_model(self):
+        """Test an unknown model returns 404, from memory after the first try"""
+        with patch.object(
+            model_cache, "_loader", side_effect=RuntimeError("Failed to load model")
+        ) as mock_loader:
+            for _ in range(2):
+                response = client.get(
+                    "/models/missing/1/predict/",
+                    params={
+                        "pclass": 1,
+                        "sex": "female",
+                        "age": 30.0,
+                        "sibsp": 0,
+                        "parch": 0,
+                        "fare": 80.0,
+                    },
+                )
+                assert response.status_code == 404
+
+        mock_loader.assert_called_once()
+
+    def test_registered_model_invalid_sex(self):
+        """Test the shared input validation applies"""
+        response = client.get(
+            "/models/titanic-classifier/1/predict/",
+            params={
+                "pclass": 1,
+                "sex": "invalid",
+                "age": 30.0,
+                "sibsp": 0,
+                "parch": 0,
+                "fare": 80.0,
+            },
+        )
+
+        assert response.status_code == 400
+
+
+class TestAdmissionControl:
+    """Test load shedding on the prediction endpoints"""
+
+    def test_overloaded_prediction_is_shed(self):
+        """Test requests over the concurrency limit get 429 with Retry-After"""
+        controller = admission_controllers.get("/predict/")
+        with patch.object(controller, "max_queue", 0), patch.object(
+            controller, "in_flight", 10_000
+        ):
+            response = client.get(
+                "/predict/",
+                params={
+                    "pclass": 1,
+                    "sex": "female",
+                    "age": 25.0,
+                    "sibsp": 0,
+                    "parch": 0,
+                    "fare": 50.0,
+                },
+            )
+
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "1"
+
+    def test_other_endpoints_are_not_shed(self):
+        """Test readiness checks bypass admission control"""
+        with patch.object(admission_controllers, "get") as mock_get:
+            response = client.get("/ready")
+
+        assert response.status_code != 429
+        mock_get.assert_not_called()
+
+    def test_only_successful_predictions_are_sampled(self):
+        """Test error responses free their slot without feeding the limit"""
+        model_state["model"] = Mock(predict=Mock(return_value=[1]))
+        controller = admission_controllers.get("/predict/")
+        params = {
+            "pclass": 1,
+            "sex": "female",
+            "age": 25.0,
+            "sibsp": 0,
+            "parch": 0,
+            "fare": 50.0,
+        }
+
+        with patch.object(controller, "release", wraps=controller.release) as release:
+            assert client.get("/predict/", params=params).status_code == 200
+            assert client.get("/predict/", params={**params, "sex": "x"}).status_code == 400
+            assert client.get("/predict/", params={"pclass": 1}).status_code == 422
+
+        assert [call.kwargs["sample"] for call in release.call_args_list] == [
+            True,
+            False,
+            False,
+        ]
+        assert controller.in_flight == 0
+
+    def test_shed_requests_are_instrumented(self):
+        """Test 429s from admission control reach http_requests_total"""
+        labels = {"handler": "/predict/", "method": "GET", "status": "4xx"}
+        before = REGISTRY.get_sample_value("http_requests_total", labels) or 0
+        controller = admission_controllers.get("/predict/")
+        with patch.object(controller, "max_queue", 0), patch.object(
+            controller, "in_flight", 10_000
+        ):
+            response = client.get("/predict/", params={"pclass": 1})
+
+        assert response.status_code == 429
+        assert REGISTRY.get_sample_value("http_requests_total", labels) == before + 1
+
+    def test_unmatched_paths_get_no_controller(self):
+        """Test paths no prediction handler serves do not create controllers"""
+        routes_before = {controller.route for controller in admission_controllers}
+
+        assert client.get("/models/a/1/predict/extra/").status_code == 404
+        assert client.get("/predict/extra/").status_code == 404
+
+        assert {controller.route for controller in admission_controllers} == routes_before
+
+    def test_unloaded_models_share_the_route_controller(self):
+        """Test requests for models that never loaded add no controllers"""
+        routes_before = {controller.route for controller in admission_controllers}
+        with patch.object(
+            model_cache, "_loader", side_effect=RuntimeError("Failed to load model")
+        ):
+            client.get(
+                "/models/titanic-segment-c/1/predict/",
+                params={
+                    "pclass": 1,
+                    "sex": "female",
+                    "age": 30.0,
+                    "sibsp": 0,
+                    "parch": 0,
+                    "fare": 80.0,
+                },
+            )
+
+        assert {controller.route for controller in admission_controllers} == routes_before
+
+    def test_loaded_model_version_has_its_own_controller(self):
+        """Test a loaded model gets one limit, shared by its stage and number"""
+        mock_model = Mock()
+        mock_model.predict.return_value = [1]
+
+        with (
+            patch.object(model_cache, "_resolver", return_value="7"),
+            patch.object(model_cache, "_loader", return_value=(mock_model, 10)),
+        ):
+            for version in ["Production", "Production", "7"]:
+                response = client.get(
+                    f"/models/titanic-segment-d/{version}/predict/",
+                    params={
+                        "pclass": 1,
+                        "sex": "female",
+                        "age": 30.0,
+                        "sibsp": 0,
+                        "parch": 0,
+                        "fare": 80.0,
+                    },
+                )
+                assert response.status_code == 200
+
+        routes = {controller.route for controller in admission_controllers}
+        assert "/models/titanic-segment-d/7/predict/" in routes
+        assert "/models/titanic-segment-d/Production/predict/" not in routes
+        assert admission_controllers.get("/predict/") is not admission_controllers.get(
+            "/models/titanic-segment-d/7/predict/"
+        )
+
+
+class TestProcessAge:
+    """Test the clock behind time_to_first_prediction_seconds"""
+
+    def test_counts_from_process_start(self):
+        """Test the age covers interpreter startup, not just the api import"""
+        import api
+
+        assert process_age_seconds() > time.monotonic() - api.IMPORTED_AT
+
+    @patch("builtins.open", side_effect=OSError("no /proc"))
+    def test_falls_back_to_import_time(self, mock_open):
+        """Test platforms without /proc count from the api import"""
+        import api
+
+        age = process_age_seconds()
+        assert 0 <= age <= time.monotonic() - api.IMPORTED_AT
+
+
+class TestImportTime:
+    """Test that importing the API stays cheap"""
+
+    def test_import_does_not_load_mlflow(self):
+        """Test mlflow is loaded lazily, off the import path"""
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import api"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+
+        # Lines look like "import time:  self [us] | cumulative | imported package".
+        timings = {}
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:"):
+                continue
+            _, cumulative, name = line.split("|")
+            if cumulative.strip().isdigit():
+                timings[name.strip()] = int(cumulative)
+        imported = list(timings)
+        total_us = timings.get("api", 0)
+
+        assert "api" in imported
+        assert not any(name.split(".")[0] == "mlflow" for name in imported), (
+            f"mlflow imported at module load ({total_us / 1e6:.2f}s total import time)"
+        )
+        # Generous budget: catches a heavy dependency creeping back onto the import path.
+        assert total_us < 5_000_000, f"importing api took {total_us / 1e6:.2f}s"
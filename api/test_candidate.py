@@ -0,0 +1,87 @@
+import threading
+from unittest.mock import Mock
+
+import pandas as pd
+
+from candidate import (
+    SHADOW_PREDICTIONS,
+    SHADOW_SKIPPED,
+    CandidateScorer,
+)
+
+INPUT_DF = pd.DataFrame([{"pclass": 1, "sex": "female", "age": 30.0}])
+
+
+def counter_value(counter):
+    return counter._value.get()
+
+
+class TestShadowScoring:
+    """Test background scoring of the candidate model"""
+
+    def test_no_candidate_is_a_no_op(self):
+        """Test nothing is shadowed or routed without a candidate model"""
+        scorer = CandidateScorer(shadow_fraction=1.0, canary_fraction=1.0)
+        assert not scorer.shadow(INPUT_DF, 1, 0.001)
+        assert not scorer.use_canary()
+
+    def test_agreement_is_counted(self):
+        """Test agreeing and disagreeing candidate predictions are counted"""
+        scorer = CandidateScorer(shadow_fraction=1.0)
+        scorer.model = Mock()
+        scorer.model.predict.return_value = [1]
+        agree_before = counter_value(SHADOW_PREDICTIONS.labels("agree"))
+        disagree_before = counter_value(SHADOW_PREDICTIONS.labels("disagree"))
+
+        assert scorer.shadow(INPUT_DF, 1, 0.001)
+        assert scorer.shadow(INPUT_DF, 0, 0.001)
+        scorer.shutdown(wait=True)
+
+        assert counter_value(SHADOW_PREDICTIONS.labels("agree")) == agree_before + 1
+        assert counter_value(SHADOW_PREDICTIONS.labels("disagree")) == disagree_before + 1
+
+    def test_candidate_errors_are_counted(self):
+        """Test a failing candidate never affects the caller"""
+        scorer = CandidateScorer(shadow_fraction=1.0)
+        scorer.model = Mock()
+        scorer.model.predict.side_effect = ValueError("bad input")
+        errors_before = counter_value(SHADOW_PREDICTIONS.labels("error"))
+
+        assert scorer.shadow(INPUT_DF, 1, 0.001)
+        scorer.shutdown(wait=True)
+
+        assert counter_value(SHADOW_PREDICTIONS.labels("error")) == errors_before + 1
+
+    def test_saturated_executor_skips(self):
+        """Test requests are skipped rather than queued when shadowing falls behind"""
+        release = threading.Event()
+        scorer = CandidateScorer(shadow_fraction=1.0, max_pending=1)
+        scorer.model = Mock()
+        scorer.model.predict.side_effect = lambda _: release.wait(5) and [1]
+        skipped_before = counter_value(SHADOW_SKIPPED)
+
+        assert scorer.shadow(INPUT_DF, 1, 0.001)
+        assert not scorer.shadow(INPUT_DF, 1, 0.001)
+        release.set()
+        scorer.shutdown(wait=True)
+
+        assert counter_value(SHADOW_SKIPPED) == skipped_before + 1
+
+    def test_canary_returns_checked_model(self):
+        """Test the routed model is the one checked, not a later re-read"""
+        scorer = CandidateScorer(canary_fraction=1.0)
+        candidate = Mock()
+        scorer.model = candidate
+
+        routed = scorer.use_canary()
+        scorer.model = None
+
+        assert routed is candidate
+
+    def test_fraction_zero_never_shadows(self):
+        """Test shadowing is disabled with a zero fraction"""
+        scorer = CandidateScorer(shadow_fraction=0.0, canary_fraction=0.0)
+        scorer.model = Mock()
+        assert not scorer.shadow(INPUT_DF, 1, 0.001)
+        assert not scorer.use_canary()
+        scorer.model.predict.assert_not_called()
@@ -0,0 +1,70 @@
+import pytest
+
+from drift import (
+    FEATURE_DRIFT_PSI,
+    PREDICTION_POSITIVE_RATE,
+    DriftMonitor,
+    population_stability_index,
+)
+
+REFERENCE_PROFILE = {
+    "numeric": {
+        "age": {"bin_edges": [20.0, 40.0], "proportions": [0.25, 0.5, 0.25]},
+    },
+    "categorical": {
+        "sex": {"male": 0.5, "female": 0.5},
+    },
+    "positive_rate": 0.4,
+}
+
+
+class TestPopulationStabilityIndex:
+    """Test PSI computation"""
+
+    def test_identical_distributions(self):
+        """Test PSI is zero when nothing drifted"""
+        assert population_stability_index([0.3, 0.7], [0.3, 0.7]) == pytest.approx(0.0)
+
+    def test_shifted_distribution(self):
+        """Test PSI grows with the shift"""
+        small = population_stability_index([0.5, 0.5], [0.4, 0.6])
+        large = population_stability_index([0.5, 0.5], [0.1, 0.9])
+        assert 0 < small < large
+
+    def test_empty_bins_stay_finite(self):
+        """Test empty bins are smoothed instead of producing infinities"""
+        assert population_stability_index([0.0, 1.0], [1.0, 0.0]) < float("inf")
+
+
+class TestDriftMonitor:
+    """Test streaming drift statistics"""
+
+    def test_matching_traffic_has_low_drift(self):
+        """Test traffic drawn like the reference profile does not drift"""
+        monitor = DriftMonitor(REFERENCE_PROFILE, decay=1.0)
+        for age, sex in [(10, "male"), (30, "female"), (30, "male"), (50, "female")]:
+            monitor.update({"age": age, "sex": sex}, 0)
+
+        assert monitor.feature_psi("age") == pytest.approx(0.0)
+        assert monitor.feature_psi("sex") == pytest.approx(0.0)
+
+    def test_shifted_traffic_raises_psi_gauges(self):
+        """Test shifted numeric and unseen categorical values are detected"""
+        monitor = DriftMonitor(REFERENCE_PROFILE, decay=1.0)
+        for _ in range(20):
+            monitor.update({"age": 80.0, "sex": "unknown"}, 1)
+
+        assert monitor.feature_psi("age") > 0.5
+        assert monitor.feature_psi("sex") > 0.5
+        assert FEATURE_DRIFT_PSI.labels("age")._value.get() > 0.5
+        assert PREDICTION_POSITIVE_RATE._value.get() == pytest.approx(1.0)
+
+    def test_decay_follows_recent_traffic(self):
+        """Test decayed counts forget old traffic"""
+        monitor = DriftMonitor(REFERENCE_PROFILE, decay=0.5)
+        for _ in range(20):
+            monitor.update({"age": 80.0, "sex": "male"}, 1)
+        for _ in range(20):
+            monitor.update({"age": 30.0, "sex": "male"}, 0)
+
+        assert PREDICTION_POSITIVE_RATE._value.get() < 0.01
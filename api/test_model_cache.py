@@ -0,0 +1,163 @@
+import threading
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+
+from model_cache import MODEL_CACHE_LOADS, ModelCache
+
+
+def make_loader(size=100):
+    loader = Mock(side_effect=lambda name, version: (f"{name}:{version}", size))
+    return loader
+
+
+class TestModelCache:
+    """Test lazy loading and LRU eviction of registered models"""
+
+    def test_models_are_loaded_once(self):
+        """Test a resident model is not loaded again"""
+        loader = make_loader()
+        cache = ModelCache(loader, memory_budget_bytes=1000)
+
+        assert cache.get("titanic", "1") == "titanic:1"
+        assert cache.get("titanic", "1") == "titanic:1"
+        loader.assert_called_once_with("titanic", "1")
+
+    def test_least_recently_used_model_is_evicted(self):
+        """Test the budget evicts the least recently used model"""
+        cache = ModelCache(make_loader(size=100), memory_budget_bytes=250)
+
+        cache.get("a", "1")
+        cache.get("b", "1")
+        cache.get("a", "1")  # "b" is now the least recently used
+        cache.get("c", "1")
+
+        assert ("a", "1") in cache
+        assert ("b", "1") not in cache
+        assert ("c", "1") in cache
+        assert cache.total_bytes == 200
+
+    def test_model_larger_than_budget_is_kept(self):
+        """Test a model bigger than the budget still serves, alone"""
+        cache = ModelCache(make_loader(size=500), memory_budget_bytes=250)
+
+        cache.get("a", "1")
+        cache.get("b", "1")
+
+        assert ("a", "1") not in cache
+        assert ("b", "1") in cache
+
+    def test_failed_load_is_retried_after_miss_ttl(self):
+        """Test a failing load raises and is retried once its miss expires"""
+        loader = Mock(side_effect=[RuntimeError("not found"), ("model", 10)])
+        cache = ModelCache(loader, memory_budget_bytes=100, miss_ttl_seconds=0)
+
+        with pytest.raises(RuntimeError):
+            cache.get("a", "1")
+        assert cache.get("a", "1") == "model"
+
+    def test_failed_load_is_remembered(self):
+        """Test repeated requests for a missing model do not reload it"""
+        loader = Mock(side_effect=RuntimeError("Failed to load model 'models:/a/1'"))
+        cache = ModelCache(loader, memory_budget_bytes=100)
+
+        for _ in range(3):
+            with pytest.raises(RuntimeError, match="Failed to load model"):
+                cache.get("a", "1")
+        loader.assert_called_once_with("a", "1")
+
+    def test_remembered_misses_are_bounded(self):
+        """Test made-up names cannot grow the miss cache without limit"""
+        cache = ModelCache(
+            Mock(side_effect=RuntimeError("missing")), memory_budget_bytes=100, max_misses=2
+        )
+
+        for name in ("a", "b", "c"):
+            with pytest.raises(RuntimeError):
+                cache.get(name, "1")
+
+        assert list(cache._misses) == [("load", "b", "1"), ("load", "c", "1")]
+
+    def test_concurrent_requests_share_one_load(self):
+        """Test concurrent first requests wait for a single load"""
+
+        def slow_loader(name, version):
+            time.sleep(0.1)
+            return "model", 10
+
+        loader = Mock(side_effect=slow_loader)
+        cache = ModelCache(loader, memory_budget_bytes=100)
+        threads = [threading.Thread(target=cache.get, args=("a", "1")) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        loader.assert_called_once()
+
+    def test_request_after_load_does_not_reload(self):
+        """Test a request arriving while a finished load is published reuses it"""
+        loader = make_loader()
+        cache = ModelCache(loader, memory_budget_bytes=1000)
+        results = []
+        labels = MODEL_CACHE_LOADS.labels
+
+        def count_load_and_race(*args):
+            # Runs between the load and its publication into the cache.
+            racer = threading.Thread(target=lambda: results.append(cache.get("a", "1")))
+            racer.start()
+            racer.join(timeout=0.05)
+            count_load_and_race.racer = racer
+            return labels(*args)
+
+        with patch.object(MODEL_CACHE_LOADS, "labels", side_effect=count_load_and_race):
+            assert cache.get("a", "1") == "a:1"
+        count_load_and_race.racer.join()
+
+        assert results == ["a:1"]
+        loader.assert_called_once_with("a", "1")
+
+
+class TestVersionResolution:
+    """Test resolving stages and aliases to version numbers"""
+
+    def test_version_numbers_are_not_resolved(self):
+        """Test a concrete version skips the registry"""
+        resolver = Mock()
+        cache = ModelCache(make_loader(), memory_budget_bytes=1000, resolver=resolver)
+
+        assert cache.resolve("titanic", "3") == "3"
+        resolver.assert_not_called()
+
+    def test_stage_resolution_is_cached(self):
+        """Test a stage is resolved once within the TTL"""
+        resolver = Mock(side_effect=["3", "4"])
+        cache = ModelCache(make_loader(), memory_budget_bytes=1000, resolver=resolver)
+
+        assert cache.resolve("titanic", "Production") == "3"
+        assert cache.resolve("titanic", "Production") == "3"
+        resolver.assert_called_once_with("titanic", "Production")
+
+    def test_failed_resolution_is_remembered(self):
+        """Test an unknown stage is not looked up on every request"""
+        resolver = Mock(side_effect=RuntimeError("no version in Bogus stage"))
+        cache = ModelCache(make_loader(), memory_budget_bytes=1000, resolver=resolver)
+
+        for _ in range(3):
+            with pytest.raises(RuntimeError, match="Bogus"):
+                cache.resolve("titanic", "Bogus")
+        resolver.assert_called_once_with("titanic", "Bogus")
+
+    def test_stage_follows_promotion_after_ttl(self):
+        """Test a promoted version is served once the resolution expires"""
+        resolver = Mock(side_effect=["3", "4"])
+        loader = make_loader()
+        cache = ModelCache(
+            loader, memory_budget_bytes=1000, resolver=resolver, resolve_ttl_seconds=0
+        )
+
+        first = cache.get("titanic", cache.resolve("titanic", "Production"))
+        second = cache.get("titanic", cache.resolve("titanic", "Production"))
+
+        assert (first, second) == ("titanic:3", "titanic:4")
@@ -0,0 +1,76 @@
+import json
+import os
+from unittest.mock import Mock, patch
+
+from prediction_log import PREDICTION_LOG_DROPPED, PredictionLogger, build_record
+
+
+def read_records(log_dir):
+    records = []
+    for name in sorted(os.listdir(log_dir)):
+        with open(os.path.join(log_dir, name), encoding="utf-8") as log_file:
+            records.extend(json.loads(line) for line in log_file)
+    return records
+
+
+class TestPredictionLogger:
+    """Test background prediction logging"""
+
+    def test_records_are_written_as_ndjson(self, tmp_path):
+        """Test queued records are flushed to NDJSON on stop"""
+        prediction_logger = PredictionLogger(str(tmp_path), flush_interval=0.05)
+        prediction_logger.start()
+
+        for index in range(10):
+            assert prediction_logger.log(
+                build_record("titanic-classifier", {"pclass": index}, index % 2)
+            )
+        prediction_logger.stop()
+
+        records = read_records(tmp_path)
+        assert [record["features"]["pclass"] for record in records] == list(range(10))
+        assert records[0]["model"] == "titanic-classifier"
+        assert records[1]["prediction"] == 1
+        assert records[0]["version"] is None
+
+    def test_files_rotate_by_size(self, tmp_path):
+        """Test a new file is started once the size limit is reached"""
+        prediction_logger = PredictionLogger(
+            str(tmp_path), batch_size=1, flush_interval=0.05, max_bytes=1
+        )
+        prediction_logger.start()
+        for index in range(3):
+            prediction_logger.log(build_record("titanic-classifier", {}, index))
+        prediction_logger.stop()
+
+        assert len(os.listdir(tmp_path)) == 3
+        assert len(read_records(tmp_path)) == 3
+
+    def test_workers_write_separate_files(self, tmp_path):
+        """Test processes sharing a log directory never share a file"""
+        for pid in (101, 102):
+            with patch("prediction_log.os.getpid", return_value=pid):
+                prediction_logger = PredictionLogger(str(tmp_path), flush_interval=0.05)
+                prediction_logger.start()
+                prediction_logger.log(build_record("titanic-classifier", {}, 1))
+                prediction_logger.stop()
+
+        names = sorted(os.listdir(tmp_path))
+        assert len(names) == 2
+        assert "-101-" in names[0] and "-102-" in names[1]
+
+    def test_full_queue_drops_and_counts(self, tmp_path):
+        """Test records are dropped instead of blocking when the queue is full"""
+        prediction_logger = PredictionLogger(str(tmp_path), max_queue_size=1)
+        # Mark as running without a consumer so the queue cannot drain.
+        prediction_logger._thread = Mock(is_alive=Mock(return_value=True))
+        dropped_before = PREDICTION_LOG_DROPPED._value.get()
+
+        assert prediction_logger.log({"prediction": 0})
+        assert not prediction_logger.log({"prediction": 1})
+        assert PREDICTION_LOG_DROPPED._value.get() == dropped_before + 1
+
+    def test_log_before_start_is_ignored(self, tmp_path):
+        """Test logging is a no-op until the logger is started"""
+        prediction_logger = PredictionLogger(str(tmp_path))
+        assert not prediction_logger.log({"prediction": 0})
@@ -0,0 +1,233 @@
+"""Benchmark the training pipeline on synthetic Titanic-schema data.
+
+Each scale runs in its own subprocess against a throwaway file-based MLflow
+store, so peak RSS is per scale and a scale that runs out of time or memory
+is recorded instead of aborting the suite. The synthetic CSV is written by
+the parent, and the subprocess runs ``train()`` before anything else, so
+peak RSS covers the training path and not the harness:
+
+    python benchmark.py --scales 1 100 10000 --output report.json
+"""
+import argparse
+import json
+import os
+import pickle
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+# Rows in the real Titanic training CSV; scales are multiples of it.
+TITANIC_ROWS = 891
+DEFAULT_SCALES = [1, 100, 10000]
+DEFAULT_TIMEOUT = 3600
+BASELINE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "benchmarks", "baseline.json"
+)
+
+# Metrics where a higher value is a regression, with the smallest absolute
+# increase worth reporting so sub-second timings at 1x do not flap.
+LOWER_IS_BETTER = {
+    "fit_seconds": 0.5,
+    "preprocess_seconds": 0.5,
+    "peak_rss_mb": 64,
+    "model_size_mb": 1,
+}
+HIGHER_IS_BETTER = ["predict_rows_per_second"]
+
+
+def make_synthetic_titanic(n_rows, seed=42):
+    """Build a Titanic-shaped CSV frame with realistic missing values."""
+    rng = np.random.default_rng(seed)
+    pclass = rng.choice([1, 2, 3], n_rows, p=[0.24, 0.21, 0.55])
+    sex = rng.choice(["male", "female"], n_rows, p=[0.65, 0.35])
+    age = rng.normal(29.7, 14.5, n_rows).clip(0.4, 80).round(1)
+    age[rng.random(n_rows) < 0.2] = np.nan
+    embarked = rng.choice(["S", "C", "Q"], n_rows, p=[0.72, 0.19, 0.09]).astype(object)
+    embarked[rng.random(n_rows) < 0.002] = None
+    fare = (rng.lognormal(2.7, 1.0, n_rows) * (4 - pclass)).round(2)
+    survival_odds = 0.2 + 0.5 * (sex == "female") + 0.1 * (3 - pclass)
+    survived = (rng.random(n_rows) < survival_odds).astype(int)
+
+    return pd.DataFrame(
+        {
+            "Survived": survived,
+            "Pclass": pclass,
+            "Sex": sex,
+            "Age": age,
+            "SibSp": rng.poisson(0.5, n_rows),
+            "Parch": rng.poisson(0.4, n_rows),
+            "Fare": fare,
+            "Embarked": embarked,
+        }
+    )
+
+
+def scale_rows(scale):
+    return max(int(round(TITANIC_ROWS * scale)), 10)
+
+
+def write_synthetic_data(scale, workdir):
+    data_path = os.path.join(workdir, "titanic.csv")
+    make_synthetic_titanic(scale_rows(scale)).to_csv(data_path, index=False)
+    return data_path
+
+
+def run_scale(scale, workdir):
+    """Run ``train()`` once on the CSV in ``workdir`` and measure it."""
+    # model_training picks its tracking URI up from the environment at import.
+    tracking_uri = f"file:{os.path.join(workdir, 'mlruns')}"
+    os.environ["MLFLOW_TRACKING_URI"] = tracking_uri
+    import mlflow
+    import model_training
+
+    mlflow.set_tracking_uri(tracking_uri)
+    mlflow.set_experiment("Titanic-Benchmark")
+    data_path = os.path.join(workdir, "titanic.csv")
+
+    model_version = model_training.train(data_url=data_path, logging_profile="lean")
+    # Read before anything else is loaded; ru_maxrss is in kilobytes on Linux.
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    data = model_training.load_data(data_path)
+    X_train, X_test, y_train, y_test = model_training.split_data(data)
+    del data
+    started = time.perf_counter()
+    model_training.build_preprocessor().fit_transform(X_train)
+    preprocess_seconds = time.perf_counter() - started
+
+    run = mlflow.get_run(model_version.run_id)
+    model = mlflow.sklearn.load_model(
+        f"models:/{model_training.REGISTERED_MODEL_NAME}/{model_version.version}"
+    )
+    started = time.perf_counter()
+    model.predict(X_test)
+    predict_seconds = time.perf_counter() - started
+
+    return {
+        "status": "ok",
+        "rows": scale_rows(scale),
+        "fit_seconds": run.data.metrics["fit_seconds"],
+        "preprocess_seconds": preprocess_seconds,
+        "peak_rss_mb": peak_rss_mb,
+        "model_size_mb": len(pickle.dumps(model)) / (1024 * 1024),
+        "predict_rows_per_second": len(X_test) / max(predict_seconds, 1e-9),
+    }
+
+
+def run_scale_subprocess(scale, timeout):
+    with tempfile.TemporaryDirectory() as workdir:
+        write_synthetic_data(scale, workdir)
+        command = [
+            sys.executable,
+            os.path.abspath(__file__),
+            "--run-scale",
+            str(scale),
+            "--workdir",
+            workdir,
+        ]
+        try:
+            result = subprocess.run(
+                command,
+                capture_output=True,
+                text=True,
+                timeout=timeout,
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+            )
+        except subprocess.TimeoutExpired:
+            return {"status": "timeout", "timeout_seconds": timeout}
+
+    if result.returncode != 0:
+        error = result.stderr.strip().splitlines()
+        return {
+            "status": "failed",
+            "returncode": result.returncode,
+            "error": error[-1] if error else "",
+        }
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def compare_to_baseline(report, baseline, tolerance=0.5):
+    """Return human readable regressions of ``report`` against ``baseline``.
+
+    A metric regresses when it is more than ``tolerance`` (a fraction) worse
+    than the baseline; a scale that used to finish and no longer does is
+    always a regression.
+    """
+    regressions = []
+    for scale, expected in baseline.get("scales", {}).items():
+        actual = report["scales"].get(scale)
+        if actual is None or expected.get("status") != "ok":
+            continue
+        if actual.get("status") != "ok":
+            regressions.append(f"scale {scale}: {actual.get('status')} (baseline ok)")
+            continue
+        for metric, minimum_increase in LOWER_IS_BETTER.items():
+            allowed = max(expected[metric] * (1 + tolerance), expected[metric] + minimum_increase)
+            if actual[metric] > allowed:
+                regressions.append(
+                    f"scale {scale}: {metric} {actual[metric]:.3f} > baseline {expected[metric]:.3f}"
+                )
+        for metric in HIGHER_IS_BETTER:
+            if actual[metric] < expected[metric] / (1 + tolerance):
+                regressions.append(
+                    f"scale {scale}: {metric} {actual[metric]:.1f} < baseline {expected[metric]:.1f}"
+                )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", nargs="+", type=float, default=DEFAULT_SCALES)
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT)
+    parser.add_argument("--output", default="benchmark_report.json")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=0.5)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--run-scale", type=float, help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run_scale is not None:
+        print(json.dumps(run_scale(args.run_scale, args.workdir)))
+        return 0
+
+    report = {
+        "environment": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+        },
+        "scales": {},
+    }
+    for scale in args.scales:
+        key = f"{scale:g}x"
+        report["scales"][key] = run_scale_subprocess(scale, args.timeout)
+        print(f"{key}: {json.dumps(report['scales'][key])}", flush=True)
+
+    with open(args.output, "w", encoding="utf-8") as report_file:
+        json.dump(report, report_file, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as baseline_file:
+            json.dump(report, baseline_file, indent=2)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline to create it")
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as baseline_file:
+        regressions = compare_to_baseline(report, json.load(baseline_file), args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,16 +1,27 @@
+import argparse
+import hashlib
+import logging
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 
+import numpy as np
 import pandas as pd
 from sklearn.compose import ColumnTransformer
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.impute import SimpleImputer
+from sklearn.metrics import accuracy_score, f1_score, roc_auc_score
 from sklearn.model_selection import train_test_split
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import OneHotEncoder
 import mlflow
 from mlflow import MlflowClient
+from mlflow.entities import Metric
 from mlflow.exceptions import MlflowException, RestException
 
+logger = logging.getLogger(__name__)
+
 mlflow.set_tracking_uri(os.getenv("MLFLOW_TRACKING_URI", "http://localhost:5000"))
 mlflow.set_experiment("Titanic-Survival")
 REGISTERED_MODEL_NAME = os.getenv("MODEL_NAME", "titanic-classifier")
@@ -33,16 +44,73 @@ TITANIC_FEATURES = [
 NUMERIC_FEATURES = ["age", "sibsp", "parch", "fare"]
 CATEGORICAL_FEATURES = ["pclass", "sex", "embarked"]
 
+DEFAULT_CLASSIFIER_PARAMS = {"n_estimators": 200, "random_state": 42}
 
-def train():
-    mlflow.sklearn.autolog()
+# Autolog settings per logging profile. "lean" keeps autologged params but
+# leaves the model to log_model() and metrics to our own batched call,
+# instead of pickling and uploading the forest twice.
+LOGGING_PROFILES = {
+    "full": {},
+    "lean": {
+        "log_models": False,
+        "log_datasets": False,
+        "log_input_examples": False,
+        "log_model_signatures": False,
+        "log_post_training_metrics": False,
+        "silent": True,
+    },
+    "off": None,
+}
+LOGGING_PROFILE = os.getenv("MLFLOW_LOGGING_PROFILE", "lean")
 
-    data = pd.read_csv(TITANIC_DATA_URL)
-    data.columns = [column.lower() for column in data.columns]
+# Features profiled at training time for drift monitoring in the API.
+DRIFT_NUMERIC_FEATURES = ["age", "fare"]
+DRIFT_CATEGORICAL_FEATURES = ["sex", "embarked", "pclass"]
+DRIFT_NUMERIC_BINS = 10
+REFERENCE_PROFILE_PATH = "reference_profile.json"
+PSI_EPSILON = 1e-4
 
-    X = data[TITANIC_FEATURES].copy()
-    y = data["survived"]
+# Incremental retraining appends new rows here and falls back to a full
+# retrain once any feature's PSI exceeds the threshold.
+DATA_SNAPSHOT_PATH = os.getenv("DATA_SNAPSHOT_PATH", "data/titanic.csv")
+DRIFT_RETRAIN_THRESHOLD = float(os.getenv("DRIFT_RETRAIN_THRESHOLD", "0.2"))
+INCREMENTAL_ESTIMATORS = int(os.getenv("INCREMENTAL_ESTIMATORS", "20"))
+# Upper bound on the incrementally grown forest; the oldest trees are dropped
+# beyond it so model size and serving latency stay flat across rounds.
+MAX_FOREST_ESTIMATORS = int(os.getenv("MAX_FOREST_ESTIMATORS", "500"))
+
+
+def build_reference_profile(X, y):
+    """Summarise the training distribution for the API's drift monitor.
+
+    Numeric features get quantile bin edges and the share of rows per bin
+    (bins are right-closed to match ``bisect.bisect_right``), categorical
+    features get their category frequencies and the labels a positive rate.
+    """
+    profile = {"numeric": {}, "categorical": {}}
+
+    for feature in DRIFT_NUMERIC_FEATURES:
+        values = X[feature].dropna().to_numpy(dtype=float)
+        quantiles = np.linspace(0, 1, DRIFT_NUMERIC_BINS + 1)[1:-1]
+        bin_edges = np.unique(np.quantile(values, quantiles))
+        counts = np.bincount(
+            np.searchsorted(bin_edges, values, side="right"),
+            minlength=len(bin_edges) + 1,
+        )
+        profile["numeric"][feature] = {
+            "bin_edges": bin_edges.tolist(),
+            "proportions": (counts / max(len(values), 1)).tolist(),
+        }
+
+    for feature in DRIFT_CATEGORICAL_FEATURES:
+        frequencies = X[feature].dropna().astype(str).value_counts(normalize=True)
+        profile["categorical"][feature] = frequencies.to_dict()
+
+    profile["positive_rate"] = float(np.mean(y))
+    return profile
 
+
+def build_preprocessor():
     numeric_pipeline = Pipeline(
         steps=[
             ("imputer", SimpleImputer(strategy="median")),
@@ -56,56 +124,326 @@ def train():
         ]
     )
 
-    preprocessor = ColumnTransformer(
+    return ColumnTransformer(
         transformers=[
             ("num", numeric_pipeline, NUMERIC_FEATURES),
             ("cat", categorical_pipeline, CATEGORICAL_FEATURES),
         ]
     )
 
-    model = Pipeline(
+
+def build_classifier(**classifier_params):
+    return RandomForestClassifier(**{**DEFAULT_CLASSIFIER_PARAMS, **classifier_params})
+
+
+def build_model(**classifier_params):
+    return Pipeline(
         steps=[
-            ("preprocessor", preprocessor),
-            ("classifier", RandomForestClassifier(n_estimators=200, random_state=42)),
+            ("preprocessor", build_preprocessor()),
+            ("classifier", build_classifier(**classifier_params)),
         ]
     )
 
-    X_train, X_test, y_train, y_test = train_test_split(
+
+def load_data(data_url):
+    data = pd.read_csv(data_url)
+    data.columns = [column.lower() for column in data.columns]
+    return data
+
+
+def register_production_version(client, model_uri, run_id):
+    try:
+        client.get_registered_model(REGISTERED_MODEL_NAME)
+    except (RestException, MlflowException):
+        client.create_registered_model(REGISTERED_MODEL_NAME)
+
+    model_version = client.create_model_version(
+        name=REGISTERED_MODEL_NAME,
+        source=model_uri,
+        run_id=run_id,
+    )
+
+    client.transition_model_version_stage(
+        name=REGISTERED_MODEL_NAME,
+        version=model_version.version,
+        stage="Production",
+        archive_existing_versions=True,
+    )
+    return model_version
+
+
+def split_data(data, test_size=0.2, random_state=42):
+    X = data[TITANIC_FEATURES].copy()
+    y = data["survived"]
+
+    return train_test_split(
         X,
         y,
-        test_size=0.2,
-        random_state=42,
+        test_size=test_size,
+        random_state=random_state,
         stratify=y,
     )
 
-    with mlflow.start_run() as run:
-        model.fit(X_train, y_train)
 
+@contextmanager
+def stage_timer(timings, stage):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = time.perf_counter() - started
+        logger.info("Stage '%s' took %.3fs", stage, timings[stage])
+
+
+def configure_autolog(profile=LOGGING_PROFILE):
+    if profile not in LOGGING_PROFILES:
+        raise ValueError(
+            f"Unknown logging profile '{profile}', expected one of {sorted(LOGGING_PROFILES)}"
+        )
+    autolog_settings = LOGGING_PROFILES[profile]
+    if autolog_settings is None:
+        mlflow.sklearn.autolog(disable=True)
+    else:
+        mlflow.sklearn.autolog(**autolog_settings)
+
+
+def evaluate_model(model, X, y, prefix="test"):
+    predictions = model.predict(X)
+    metrics = {
+        f"{prefix}_accuracy": accuracy_score(y, predictions),
+        f"{prefix}_f1": f1_score(y, predictions, zero_division=0),
+    }
+    # ROC AUC is undefined unless both the labels and the model have two classes.
+    if len(model.classes_) == 2 and len(np.unique(y)) == 2:
+        metrics[f"{prefix}_roc_auc"] = roc_auc_score(y, model.predict_proba(X)[:, 1])
+    return metrics
+
+
+def log_metrics_batch(client, run_id, metrics):
+    timestamp = int(time.time() * 1000)
+    client.log_batch(
+        run_id,
+        metrics=[Metric(key, float(value), timestamp, 0) for key, value in metrics.items()],
+    )
+
+
+def log_and_register(run, model, X_train, y_train, timings=None):
+    """Log the fitted model and its reference profile, then promote it."""
+    timings = {} if timings is None else timings
+
+    with stage_timer(timings, "log_model"):
         model_info = mlflow.sklearn.log_model(
             model,
             artifact_path="model",
             input_example=X_train.iloc[:1],
         )
 
-        client = MlflowClient()
-        try:
-            client.get_registered_model(REGISTERED_MODEL_NAME)
-        except (RestException, MlflowException):
-            client.create_registered_model(REGISTERED_MODEL_NAME)
+    client = MlflowClient()
+    with stage_timer(timings, "register"):
+        client.log_dict(
+            run.info.run_id,
+            build_reference_profile(X_train, y_train),
+            REFERENCE_PROFILE_PATH,
+        )
+        return register_production_version(client, model_info.model_uri, run.info.run_id)
+
+
+def train(data_url=TITANIC_DATA_URL, logging_profile=LOGGING_PROFILE):
+    configure_autolog(logging_profile)
+    timings = {}
+
+    with stage_timer(timings, "load_data"):
+        data = load_data(data_url)
+    model = build_model()
+    with stage_timer(timings, "split"):
+        X_train, X_test, y_train, y_test = split_data(data)
+
+    with mlflow.start_run() as run:
+        with stage_timer(timings, "fit"):
+            model.fit(X_train, y_train)
+
+        # Evaluate while the main thread serializes and uploads the model.
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            evaluation = executor.submit(
+                timed_evaluation, timings, model, X_test, y_test
+            )
+            model_version = log_and_register(run, model, X_train, y_train, timings)
+            metrics = evaluation.result()
+
+        metrics.update({f"{stage}_seconds": value for stage, value in timings.items()})
+        log_metrics_batch(MlflowClient(), run.info.run_id, metrics)
+        return model_version
+
+
+def timed_evaluation(timings, model, X, y):
+    with stage_timer(timings, "evaluate"):
+        return evaluate_model(model, X, y)
+
+
+def profile_drift(reference_profile, X):
+    """Return the PSI of each profiled feature in ``X`` against the reference."""
+    scores = {}
+
+    for feature, profile in reference_profile["numeric"].items():
+        values = X[feature].dropna().to_numpy(dtype=float)
+        counts = np.bincount(
+            np.searchsorted(profile["bin_edges"], values, side="right"),
+            minlength=len(profile["proportions"]),
+        )
+        scores[feature] = population_stability_index(
+            profile["proportions"], counts / max(len(values), 1)
+        )
+
+    for feature, frequencies in reference_profile["categorical"].items():
+        values = X[feature].dropna().astype(str)
+        actual = values.value_counts(normalize=True)
+        known = [float(actual.get(category, 0.0)) for category in frequencies]
+        scores[feature] = population_stability_index(
+            list(frequencies.values()) + [0.0], known + [max(0.0, 1.0 - sum(known))]
+        )
+
+    return scores
+
+
+def population_stability_index(expected, actual):
+    expected = np.clip(np.asarray(expected, dtype=float), PSI_EPSILON, None)
+    actual = np.clip(np.asarray(actual, dtype=float), PSI_EPSILON, None)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def append_to_snapshot(new_data, snapshot_path=DATA_SNAPSHOT_PATH, data_url=TITANIC_DATA_URL):
+    """Append labelled rows to the local dataset snapshot.
+
+    The snapshot is seeded from ``data_url`` the first time; afterwards rows
+    are appended without reading it back, so the cost follows the new data.
+    Each batch is recorded by content hash in ``<snapshot>.batches`` and a
+    batch already recorded is skipped, so rerunning a failed retrain does
+    not append the same rows twice. Returns whether rows were appended.
+    """
+    columns = TITANIC_FEATURES + ["survived"]
+    batch_id = hashlib.sha256(
+        pd.util.hash_pandas_object(new_data[columns], index=False).to_numpy().tobytes()
+    ).hexdigest()
+    manifest_path = f"{snapshot_path}.batches"
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding="utf-8") as manifest:
+            if batch_id in manifest.read().split():
+                logger.info("Batch %s is already in the snapshot; skipping", batch_id)
+                return False
+
+    if not os.path.exists(snapshot_path):
+        os.makedirs(os.path.dirname(snapshot_path) or ".", exist_ok=True)
+        load_data(data_url)[columns].to_csv(snapshot_path, index=False)
+    new_data[columns].to_csv(snapshot_path, mode="a", header=False, index=False)
+    with open(manifest_path, "a", encoding="utf-8") as manifest:
+        manifest.write(batch_id + "\n")
+    return True
+
 
-        model_version = client.create_model_version(
-            name=REGISTERED_MODEL_NAME,
-            source=model_info.model_uri,
-            run_id=run.info.run_id,
+def tag_lineage(client, model_version, parent, training_mode):
+    """Tag a registered version with the Production version it was derived from."""
+    tags = {
+        "parent_version": parent.version,
+        "parent_run_id": parent.run_id,
+        "training_mode": training_mode,
+    }
+    for key, value in tags.items():
+        client.set_model_version_tag(REGISTERED_MODEL_NAME, model_version.version, key, value)
+
+
+def retrain_incremental(
+    new_data_url,
+    drift_threshold=DRIFT_RETRAIN_THRESHOLD,
+    n_new_estimators=INCREMENTAL_ESTIMATORS,
+    snapshot_path=DATA_SNAPSHOT_PATH,
+):
+    """Grow the Production forest with trees fitted on newly labelled rows.
+
+    New rows are appended to the snapshot first. If any feature drifted past
+    ``drift_threshold`` against the parent's reference profile, or the new
+    rows lack a class, a full ``train()`` on the snapshot runs instead.
+    Otherwise the parent's preprocessing is kept and only the new trees are
+    fitted; the oldest trees are dropped to stay within
+    ``MAX_FOREST_ESTIMATORS``. Either way the new version is tagged with
+    lineage to its parent.
+    """
+    new_data = load_data(new_data_url)
+    append_to_snapshot(new_data, snapshot_path)
+
+    client = MlflowClient()
+    parent = client.get_latest_versions(REGISTERED_MODEL_NAME, stages=["Production"])[0]
+    reference_profile = mlflow.artifacts.load_dict(
+        f"runs:/{parent.run_id}/{REFERENCE_PROFILE_PATH}"
+    )
+
+    X_new = new_data[TITANIC_FEATURES].copy()
+    y_new = new_data["survived"]
+    drift = profile_drift(reference_profile, X_new)
+    if max(drift.values()) > drift_threshold or y_new.nunique() < 2:
+        model_version = train(data_url=snapshot_path)
+        tag_lineage(client, model_version, parent, "full_retrain")
+        return model_version
+
+    # Load the exact parent version, in case Production moves meanwhile.
+    model = mlflow.sklearn.load_model(f"models:/{REGISTERED_MODEL_NAME}/{parent.version}")
+    classifier = model.named_steps["classifier"]
+    parent_estimators = classifier.n_estimators
+    n_dropped = max(0, parent_estimators + n_new_estimators - MAX_FOREST_ESTIMATORS)
+
+    with mlflow.start_run() as run:
+        parent_accuracy = float(np.mean(model.predict(X_new) == y_new))
+
+        # warm_start only fits trees beyond len(estimators_), so dropping the
+        # oldest ones first keeps the forest at the cap.
+        classifier.estimators_ = classifier.estimators_[n_dropped:]
+        classifier.set_params(
+            warm_start=True,
+            n_estimators=len(classifier.estimators_) + n_new_estimators,
         )
+        classifier.fit(model.named_steps["preprocessor"].transform(X_new), y_new)
 
-        client.transition_model_version_stage(
-            name=REGISTERED_MODEL_NAME,
-            version=model_version.version,
-            stage="Production",
-            archive_existing_versions=True,
+        mlflow.log_params(
+            {
+                "training_mode": "incremental",
+                "parent_version": parent.version,
+                "parent_n_estimators": parent_estimators,
+                "n_estimators": classifier.n_estimators,
+                "n_dropped_estimators": n_dropped,
+                "n_new_rows": len(new_data),
+            }
+        )
+        mlflow.log_metrics(
+            {
+                "parent_accuracy_on_new_data": parent_accuracy,
+                **{f"drift_psi_{feature}": score for feature, score in drift.items()},
+            }
         )
 
+        model_info = mlflow.sklearn.log_model(
+            model,
+            artifact_path="model",
+            input_example=X_new.iloc[:1],
+        )
+        # The forest still reflects the parent's training data, so keep its profile.
+        client.log_dict(run.info.run_id, reference_profile, REFERENCE_PROFILE_PATH)
+
+        model_version = register_production_version(
+            client, model_info.model_uri, run.info.run_id
+        )
+        tag_lineage(client, model_version, parent, "incremental")
+        return model_version
+
+
 # Output
 if __name__ == "__main__":
-    train()
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--new-data",
+        help="CSV of newly labelled rows to add to the Production model incrementally",
+    )
+    args = parser.parse_args()
+
+    if args.new_data:
+        retrain_incremental(args.new_data)
+    else:
+        train()
\ No newline at end of file
@@ -0,0 +1,254 @@
+"""Train the Titanic classifier on CSVs that do not fit in memory.
+
+The data is streamed in chunks three times and never loaded whole:
+
+1. Count rows and chunks, collect category vocabularies, and keep a
+   fixed-size reservoir sample of training rows. The sample supplies the
+   imputer medians, the reference profile and the input example.
+2. Fit a small forest on each chunk's training rows. A fixed-size
+   reservoir of their trees becomes the final forest.
+3. Score the held-out rows.
+
+Rows go to the test set by hashing their contents, separately for each
+label, so the split is stratified and the same on every pass without
+holding any indices. Peak memory depends on ``chunksize``,
+``sample_size`` and ``n_estimators``, not on the size of the input.
+"""
+import argparse
+import math
+
+import mlflow
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.pipeline import Pipeline
+
+from model_training import (
+    CATEGORICAL_FEATURES,
+    DEFAULT_CLASSIFIER_PARAMS,
+    NUMERIC_FEATURES,
+    TITANIC_DATA_URL,
+    TITANIC_FEATURES,
+    build_preprocessor,
+    log_and_register,
+    log_metrics_batch,
+    stage_timer,
+)
+from mlflow import MlflowClient
+
+DEFAULT_CHUNKSIZE = 100_000
+DEFAULT_SAMPLE_SIZE = 50_000
+TEST_FRACTION = 0.2
+# Resolution of the hash split; the test set is the lowest buckets.
+HASH_BUCKETS = 10_000
+COLUMNS = TITANIC_FEATURES + ["survived"]
+
+
+def iter_chunks(data_url, chunksize=DEFAULT_CHUNKSIZE):
+    reader = pd.read_csv(
+        data_url,
+        chunksize=chunksize,
+        usecols=lambda column: column.lower() in COLUMNS,
+    )
+    for chunk in reader:
+        chunk.columns = [column.lower() for column in chunk.columns]
+        yield chunk[COLUMNS]
+
+
+def is_test_row(chunk, test_fraction=TEST_FRACTION):
+    """Assign rows to the test set by hashing their contents.
+
+    The label is part of the hash, so each class is split independently
+    with the same fraction. Any given row always lands on the same side.
+    """
+    hashes = pd.util.hash_pandas_object(chunk, index=False).to_numpy()
+    return (hashes % HASH_BUCKETS) < int(test_fraction * HASH_BUCKETS)
+
+
+def update_reservoir(reservoir, rows, seen, size, rng):
+    """Add ``rows`` to a uniform reservoir sample of at most ``size`` rows.
+
+    ``seen`` is the number of rows offered before this call. Returns the
+    new reservoir.
+    """
+    if reservoir is None:
+        reservoir = rows.iloc[:0]
+    if len(reservoir) < size:
+        fill = size - len(reservoir)
+        reservoir = pd.concat([reservoir, rows.iloc[:fill]], ignore_index=True)
+        seen += min(fill, len(rows))
+        rows = rows.iloc[fill:]
+    if len(rows):
+        # Algorithm R, vectorised: row t replaces slot j ~ U[0, t] when j < size.
+        slots = rng.integers(0, seen + np.arange(1, len(rows) + 1))
+        keep = slots < size
+        reservoir.iloc[slots[keep]] = rows[keep].to_numpy()
+    return reservoir
+
+
+def fit_preprocessor_from_stats(medians, category_counts):
+    """Fit the training preprocessor on a frame that reproduces the stats.
+
+    Every numeric column holds its median, so the median imputers learn the
+    median. Each categorical column lists its vocabulary once and repeats
+    the most frequent category, so the most-frequent imputers and one-hot
+    encoders learn the right values.
+    """
+    n_rows = max(len(counts) for counts in category_counts.values()) + 1
+    summary = {feature: [medians[feature]] * n_rows for feature in NUMERIC_FEATURES}
+    for feature in CATEGORICAL_FEATURES:
+        counts = category_counts[feature]
+        mode = max(counts, key=counts.get)
+        values = list(counts)
+        summary[feature] = values + [mode] * (n_rows - len(values))
+    return build_preprocessor().fit(pd.DataFrame(summary)[TITANIC_FEATURES])
+
+
+def scan(data_url, chunksize, sample_size, test_fraction, rng):
+    """First pass: row counts, category vocabularies and a training-row sample."""
+    category_counts = {feature: {} for feature in CATEGORICAL_FEATURES}
+    reservoir = None
+    n_chunks = n_train = 0
+
+    for chunk in iter_chunks(data_url, chunksize):
+        n_chunks += 1
+        train_rows = chunk[~is_test_row(chunk, test_fraction)]
+        for feature in CATEGORICAL_FEATURES:
+            for value, count in train_rows[feature].dropna().value_counts().items():
+                counts = category_counts[feature]
+                counts[value] = counts.get(value, 0) + count
+        reservoir = update_reservoir(reservoir, train_rows, n_train, sample_size, rng)
+        n_train += len(train_rows)
+
+    reservoir = reservoir.astype(
+        {feature: float for feature in NUMERIC_FEATURES} | {"survived": int}
+    )
+    return {
+        "n_chunks": n_chunks,
+        "n_train": n_train,
+        "category_counts": category_counts,
+        "sample": reservoir,
+    }
+
+
+def fit_chunked_forest(
+    data_url, preprocessor, n_chunks, chunksize, n_estimators, test_fraction, rng
+):
+    """Second pass: fit a forest per chunk and keep a reservoir of their trees."""
+    trees_per_chunk = max(1, math.ceil(n_estimators / max(n_chunks, 1)))
+    forest = None
+    trees = []
+    trees_seen = 0
+
+    for chunk in iter_chunks(data_url, chunksize):
+        train_rows = chunk[~is_test_row(chunk, test_fraction)]
+        # Trees from a single-class chunk would disagree on the class layout.
+        if train_rows["survived"].nunique() < 2:
+            continue
+        chunk_forest = RandomForestClassifier(
+            n_estimators=trees_per_chunk,
+            random_state=int(rng.integers(2**31 - 1)),
+        )
+        chunk_forest.fit(
+            preprocessor.transform(train_rows[TITANIC_FEATURES]), train_rows["survived"]
+        )
+
+        if forest is None:
+            forest = chunk_forest
+        for tree in chunk_forest.estimators_:
+            if len(trees) < n_estimators:
+                trees.append(tree)
+            else:
+                slot = rng.integers(0, trees_seen + 1)
+                if slot < n_estimators:
+                    trees[slot] = tree
+            trees_seen += 1
+
+    if forest is None:
+        raise ValueError("No chunk contained both classes; cannot fit a forest")
+
+    # Reuse a fitted forest as the container so its fitted attributes stay valid.
+    forest.estimators_ = trees
+    forest.n_estimators = len(trees)
+    return forest
+
+
+def evaluate_streaming(model, data_url, chunksize, test_fraction):
+    """Third pass: accuracy on the hashed test split."""
+    correct = total = 0
+    for chunk in iter_chunks(data_url, chunksize):
+        test_rows = chunk[is_test_row(chunk, test_fraction)]
+        if test_rows.empty:
+            continue
+        predictions = model.predict(test_rows[TITANIC_FEATURES])
+        correct += int((predictions == test_rows["survived"].to_numpy()).sum())
+        total += len(test_rows)
+    return {"test_accuracy": correct / total} if total else {}
+
+
+def train_out_of_core(
+    data_url=TITANIC_DATA_URL,
+    chunksize=DEFAULT_CHUNKSIZE,
+    n_estimators=DEFAULT_CLASSIFIER_PARAMS["n_estimators"],
+    sample_size=DEFAULT_SAMPLE_SIZE,
+    test_fraction=TEST_FRACTION,
+    random_state=DEFAULT_CLASSIFIER_PARAMS["random_state"],
+):
+    rng = np.random.default_rng(random_state)
+    timings = {}
+
+    with stage_timer(timings, "scan"):
+        stats = scan(data_url, chunksize, sample_size, test_fraction, rng)
+    sample = stats["sample"]
+    medians = sample[NUMERIC_FEATURES].median().to_dict()
+    preprocessor = fit_preprocessor_from_stats(medians, stats["category_counts"])
+
+    with mlflow.start_run() as run:
+        with stage_timer(timings, "fit"):
+            forest = fit_chunked_forest(
+                data_url,
+                preprocessor,
+                stats["n_chunks"],
+                chunksize,
+                n_estimators,
+                test_fraction,
+                rng,
+            )
+        model = Pipeline(steps=[("preprocessor", preprocessor), ("classifier", forest)])
+
+        with stage_timer(timings, "evaluate"):
+            metrics = evaluate_streaming(model, data_url, chunksize, test_fraction)
+
+        mlflow.log_params(
+            {
+                "training_mode": "out_of_core",
+                "chunksize": chunksize,
+                "n_estimators": forest.n_estimators,
+                "n_chunks": stats["n_chunks"],
+                "n_train_rows": stats["n_train"],
+            }
+        )
+        model_version = log_and_register(
+            run, model, sample[TITANIC_FEATURES], sample["survived"], timings
+        )
+        metrics.update({f"{stage}_seconds": value for stage, value in timings.items()})
+        log_metrics_batch(MlflowClient(), run.info.run_id, metrics)
+        return model_version
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Out-of-core training on large CSVs")
+    parser.add_argument("--data-url", default=TITANIC_DATA_URL)
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument(
+        "--n-estimators", type=int, default=DEFAULT_CLASSIFIER_PARAMS["n_estimators"]
+    )
+    parser.add_argument("--sample-size", type=int, default=DEFAULT_SAMPLE_SIZE)
+    args = parser.parse_args()
+
+    train_out_of_core(
+        data_url=args.data_url,
+        chunksize=args.chunksize,
+        n_estimators=args.n_estimators,
+        sample_size=args.sample_size,
+    )
@@ -0,0 +1,89 @@
+import pytest
+
+from benchmark import (
+    TITANIC_ROWS,
+    compare_to_baseline,
+    make_synthetic_titanic,
+    run_scale_subprocess,
+)
+from model_training import TITANIC_FEATURES
+
+BASELINE = {
+    "scales": {
+        "1x": {
+            "status": "ok",
+            "fit_seconds": 10.0,
+            "preprocess_seconds": 1.0,
+            "peak_rss_mb": 400.0,
+            "model_size_mb": 6.0,
+            "predict_rows_per_second": 5000.0,
+        },
+        "10000x": {"status": "timeout"},
+    }
+}
+
+
+class TestSyntheticData:
+    """Test synthetic Titanic-schema data"""
+
+    def test_schema_matches_titanic(self):
+        """Test the synthetic frame has the Titanic columns and missing values"""
+        data = make_synthetic_titanic(TITANIC_ROWS)
+        columns = [column.lower() for column in data.columns]
+
+        assert len(data) == TITANIC_ROWS
+        assert set(TITANIC_FEATURES + ["survived"]) == set(columns)
+        assert data["Age"].isna().any()
+        assert set(data["Survived"]) == {0, 1}
+
+
+class TestBaselineComparison:
+    """Test regression detection against the stored baseline"""
+
+    def test_no_regression(self):
+        """Test noise within tolerance is accepted"""
+        report = {"scales": {"1x": {**BASELINE["scales"]["1x"], "fit_seconds": 12.0}}}
+        assert compare_to_baseline(report, BASELINE) == []
+
+    def test_slower_fit_is_a_regression(self):
+        """Test a much slower fit is reported"""
+        report = {"scales": {"1x": {**BASELINE["scales"]["1x"], "fit_seconds": 20.0}}}
+        regressions = compare_to_baseline(report, BASELINE)
+        assert len(regressions) == 1
+        assert "fit_seconds" in regressions[0]
+
+    def test_lower_throughput_is_a_regression(self):
+        """Test lower predict throughput is reported"""
+        report = {
+            "scales": {
+                "1x": {**BASELINE["scales"]["1x"], "predict_rows_per_second": 1000.0}
+            }
+        }
+        assert "predict_rows_per_second" in compare_to_baseline(report, BASELINE)[0]
+
+    def test_small_absolute_changes_are_ignored(self):
+        """Test sub-second timing changes do not flap"""
+        report = {
+            "scales": {"1x": {**BASELINE["scales"]["1x"], "preprocess_seconds": 1.4}}
+        }
+        assert compare_to_baseline(report, BASELINE) == []
+
+    def test_scale_that_stopped_finishing(self):
+        """Test a scale that no longer finishes is a regression"""
+        report = {"scales": {"1x": {"status": "timeout"}, "10000x": {"status": "timeout"}}}
+        assert compare_to_baseline(report, BASELINE) == ["scale 1x: timeout (baseline ok)"]
+
+
+@pytest.mark.slow
+class TestBenchmarkRun:
+    """Test an end-to-end benchmark run"""
+
+    def test_run_small_scale(self):
+        """Test a small scale trains against a throwaway MLflow store"""
+        result = run_scale_subprocess(0.1, timeout=600)
+
+        assert result["status"] == "ok", result
+        assert result["rows"] == round(TITANIC_ROWS * 0.1)
+        assert result["fit_seconds"] > 0
+        assert result["model_size_mb"] > 0
+        assert result["predict_rows_per_second"] > 0
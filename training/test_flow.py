@@ -0,0 +1,78 @@
+from unittest.mock import Mock, patch
+
+import pytest
+from prefect.testing.utilities import prefect_test_harness
+
+from benchmark import make_synthetic_titanic
+from flow import train_flow
+
+
+@pytest.fixture(scope="module", autouse=True)
+def prefect_backend():
+    with prefect_test_harness():
+        yield
+
+
+def make_titanic_frame(n_rows):
+    # What load_data() returns: the synthetic CSV frame with lowercase columns.
+    return make_synthetic_titanic(n_rows).rename(columns=str.lower)
+
+
+class TestTrainingFlow:
+    """Test the Prefect training flow"""
+
+    @patch("flow.mlflow")
+    @patch("flow.log_and_register")
+    @patch("flow.load_data")
+    def test_unchanged_stages_are_cached(
+        self, mock_load_data, mock_log_and_register, mock_mlflow
+    ):
+        """Test a second run with the same inputs skips every stage"""
+        mock_load_data.return_value = make_titanic_frame(100)
+        mock_log_and_register.return_value = Mock(version="1")
+
+        first = train_flow(data_url="titanic.csv", n_estimators=5)
+        second = train_flow(data_url="titanic.csv", n_estimators=5)
+
+        assert first == second == "1"
+        mock_load_data.assert_called_once_with("titanic.csv")
+        mock_log_and_register.assert_called_once()
+
+        metrics = mock_mlflow.log_metrics.call_args[0][0]
+        assert {"train_accuracy", "test_accuracy", "test_roc_auc"} <= set(metrics)
+
+    @patch("flow.mlflow")
+    @patch("flow.log_and_register")
+    @patch("flow.load_data")
+    def test_changed_hyperparameters_refit_model(
+        self, mock_load_data, mock_log_and_register, mock_mlflow
+    ):
+        """Test changing a hyperparameter refits and registers a new model"""
+        mock_load_data.return_value = make_titanic_frame(100)
+        mock_log_and_register.return_value = Mock(version="2")
+
+        train_flow(data_url="other.csv", n_estimators=5)
+        train_flow(data_url="other.csv", n_estimators=7)
+
+        mock_load_data.assert_called_once_with("other.csv")
+        assert mock_log_and_register.call_count == 2
+        refit_model = mock_log_and_register.call_args[0][1]
+        assert refit_model.named_steps["classifier"].n_estimators == 7
+
+    @patch("flow.mlflow")
+    @patch("flow.log_and_register")
+    @patch("flow.load_data")
+    def test_data_is_refetched_each_day(
+        self, mock_load_data, mock_log_and_register, mock_mlflow
+    ):
+        """Test the next day's run fetches fresh data but reuses unchanged stages"""
+        mock_load_data.return_value = make_titanic_frame(100)
+        mock_log_and_register.return_value = Mock(version="3")
+
+        for day in ("2026-10-19", "2026-10-20"):
+            with patch("flow.data_refresh_bucket", return_value=day):
+                train_flow(data_url="daily.csv", n_estimators=5)
+
+        assert mock_load_data.call_count == 2
+        # The fetched data did not change, so no new version is registered.
+        mock_log_and_register.assert_called_once()
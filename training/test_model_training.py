@@ -5,6 +5,13 @@ import numpy as np
 from sklearn.pipeline import Pipeline
 from model_training import (
     train,
+    append_to_snapshot,
+    build_model,
+    build_reference_profile,
+    configure_autolog,
+    evaluate_model,
+    profile_drift,
+    retrain_incremental,
     TITANIC_FEATURES,
     NUMERIC_FEATURES,
     CATEGORICAL_FEATURES,
@@ -290,6 +297,304 @@ class TestTrainingPipeline:
         )
 
 
+class TestReferenceProfile:
+    """Test the training profile used for drift monitoring"""
+
+    def test_build_reference_profile(self):
+        """Test numeric bins, category frequencies and positive rate"""
+        X = pd.DataFrame(
+            {
+                "pclass": [1, 2, 3, 3],
+                "sex": ["male", "female", "male", "male"],
+                "age": [10.0, 20.0, np.nan, 40.0],
+                "sibsp": [0, 1, 0, 1],
+                "parch": [0, 0, 1, 2],
+                "fare": [50.0, 25.0, 15.0, 100.0],
+                "embarked": ["S", "C", None, "S"],
+            }
+        )
+        y = pd.Series([1, 0, 0, 1])
+
+        profile = build_reference_profile(X, y)
+
+        age = profile["numeric"]["age"]
+        assert len(age["proportions"]) == len(age["bin_edges"]) + 1
+        assert sum(age["proportions"]) == pytest.approx(1.0)
+        assert profile["categorical"]["pclass"]["3"] == pytest.approx(0.5)
+        assert profile["categorical"]["embarked"] == {
+            "S": pytest.approx(2 / 3),
+            "C": pytest.approx(1 / 3),
+        }
+        assert profile["positive_rate"] == pytest.approx(0.5)
+
+
+def make_titanic_frame(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "pclass": rng.integers(1, 4, n_rows),
+            "sex": rng.choice(["male", "female"], n_rows),
+            "age": rng.uniform(1, 80, n_rows),
+            "sibsp": rng.integers(0, 4, n_rows),
+            "parch": rng.integers(0, 3, n_rows),
+            "fare": rng.uniform(5, 200, n_rows),
+            "embarked": rng.choice(["S", "C", "Q"], n_rows),
+            "survived": np.tile([0, 1], n_rows // 2),
+        }
+    )
+
+
+class TestIncrementalRetraining:
+    """Test warm-started retraining on newly labelled rows"""
+
+    def test_profile_drift(self):
+        """Test drift is low for similar data and high for shifted data"""
+        reference = make_titanic_frame(400, seed=0)
+        profile = build_reference_profile(reference, reference["survived"])
+
+        similar = profile_drift(profile, make_titanic_frame(400, seed=1))
+        shifted_data = make_titanic_frame(400, seed=1)
+        shifted_data["fare"] += 500
+        shifted_data["sex"] = "male"
+        shifted = profile_drift(profile, shifted_data)
+
+        assert max(similar.values()) < 0.2
+        assert shifted["fare"] > 1
+        assert shifted["sex"] > 0.2
+
+    def test_append_to_snapshot(self, tmp_path):
+        """Test the snapshot is seeded once and then appended to"""
+        snapshot_path = str(tmp_path / "titanic.csv")
+        seed = make_titanic_frame(4)
+        seed.columns = [column.capitalize() for column in seed.columns]
+
+        with patch("model_training.pd.read_csv", return_value=seed):
+            append_to_snapshot(make_titanic_frame(2, seed=1), snapshot_path)
+        append_to_snapshot(make_titanic_frame(2, seed=2), snapshot_path)
+
+        snapshot = pd.read_csv(snapshot_path)
+        assert len(snapshot) == 8
+        assert list(snapshot.columns) == TITANIC_FEATURES + ["survived"]
+
+    def test_append_to_snapshot_skips_repeated_batch(self, tmp_path):
+        """Test rerunning with the same batch does not duplicate its rows"""
+        snapshot_path = str(tmp_path / "titanic.csv")
+        make_titanic_frame(4).to_csv(snapshot_path, index=False)
+        new_data = make_titanic_frame(2, seed=5)
+
+        assert append_to_snapshot(new_data, snapshot_path)
+        assert not append_to_snapshot(new_data, snapshot_path)
+        assert append_to_snapshot(make_titanic_frame(2, seed=6), snapshot_path)
+
+        assert len(pd.read_csv(snapshot_path)) == 8
+
+    @patch("model_training.mlflow.sklearn.log_model")
+    @patch("model_training.mlflow.log_metrics")
+    @patch("model_training.mlflow.log_params")
+    @patch("model_training.mlflow.start_run")
+    @patch("model_training.mlflow.sklearn.load_model")
+    @patch("model_training.mlflow.artifacts.load_dict")
+    @patch("model_training.MlflowClient")
+    @patch("model_training.load_data")
+    def test_retrain_incremental_adds_trees(
+        self,
+        mock_load_data,
+        mock_mlflow_client,
+        mock_load_dict,
+        mock_load_model,
+        mock_start_run,
+        mock_log_params,
+        mock_log_metrics,
+        mock_log_model,
+        tmp_path,
+    ):
+        """Test new trees are fitted on new rows and registered with lineage"""
+        parent_data = make_titanic_frame(1000, seed=0)
+        parent_model = build_model()
+        parent_model.set_params(classifier__n_estimators=10)
+        parent_model.fit(parent_data[TITANIC_FEATURES], parent_data["survived"])
+        mock_load_model.return_value = parent_model
+        mock_load_dict.return_value = build_reference_profile(
+            parent_data, parent_data["survived"]
+        )
+        mock_load_data.return_value = make_titanic_frame(1000, seed=1)
+
+        mock_client = mock_mlflow_client.return_value
+        mock_client.get_latest_versions.return_value = [
+            Mock(version="3", run_id="parent_run")
+        ]
+        mock_client.create_model_version.return_value = Mock(version="4")
+        mock_start_run.return_value.__enter__.return_value = Mock(
+            info=Mock(run_id="child_run")
+        )
+
+        snapshot_path = str(tmp_path / "titanic.csv")
+        make_titanic_frame(200).to_csv(snapshot_path, index=False)
+        with patch("model_training.train") as mock_train:
+            retrain_incremental("new.csv", n_new_estimators=5, snapshot_path=snapshot_path)
+        mock_train.assert_not_called()
+
+        classifier = parent_model.named_steps["classifier"]
+        assert classifier.n_estimators == 15
+        assert len(classifier.estimators_) == 15
+        assert len(pd.read_csv(snapshot_path)) == 1200
+        mock_client.set_model_version_tag.assert_any_call(
+            REGISTERED_MODEL_NAME, "4", "parent_version", "3"
+        )
+        mock_client.transition_model_version_stage.assert_called_once()
+        mock_load_model.assert_called_once_with(f"models:/{REGISTERED_MODEL_NAME}/3")
+
+    @patch("model_training.MAX_FOREST_ESTIMATORS", 12)
+    @patch("model_training.mlflow.sklearn.log_model")
+    @patch("model_training.mlflow.log_metrics")
+    @patch("model_training.mlflow.log_params")
+    @patch("model_training.mlflow.start_run")
+    @patch("model_training.mlflow.sklearn.load_model")
+    @patch("model_training.mlflow.artifacts.load_dict")
+    @patch("model_training.MlflowClient")
+    @patch("model_training.load_data")
+    def test_retrain_incremental_caps_forest(
+        self,
+        mock_load_data,
+        mock_mlflow_client,
+        mock_load_dict,
+        mock_load_model,
+        mock_start_run,
+        mock_log_params,
+        mock_log_metrics,
+        mock_log_model,
+        tmp_path,
+    ):
+        """Test the oldest trees are dropped once the forest reaches the cap"""
+        parent_data = make_titanic_frame(1000, seed=0)
+        parent_model = build_model()
+        parent_model.set_params(classifier__n_estimators=10)
+        parent_model.fit(parent_data[TITANIC_FEATURES], parent_data["survived"])
+        newest_parent_trees = parent_model.named_steps["classifier"].estimators_[3:]
+        mock_load_model.return_value = parent_model
+        mock_load_dict.return_value = build_reference_profile(
+            parent_data, parent_data["survived"]
+        )
+        mock_load_data.return_value = make_titanic_frame(1000, seed=1)
+        mock_client = mock_mlflow_client.return_value
+        mock_client.get_latest_versions.return_value = [
+            Mock(version="3", run_id="parent_run")
+        ]
+        mock_start_run.return_value.__enter__.return_value = Mock(
+            info=Mock(run_id="child_run")
+        )
+
+        retrain_incremental(
+            "new.csv", n_new_estimators=5, snapshot_path=str(tmp_path / "titanic.csv")
+        )
+
+        classifier = parent_model.named_steps["classifier"]
+        assert classifier.n_estimators == 12
+        assert len(classifier.estimators_) == 12
+        assert classifier.estimators_[:7] == newest_parent_trees
+        assert mock_log_params.call_args[0][0]["n_dropped_estimators"] == 3
+
+    @patch("model_training.mlflow.artifacts.load_dict")
+    @patch("model_training.MlflowClient")
+    @patch("model_training.load_data")
+    def test_retrain_incremental_falls_back_on_drift(
+        self, mock_load_data, mock_mlflow_client, mock_load_dict, tmp_path
+    ):
+        """Test a full retrain on the snapshot runs when drift is too high"""
+        parent_data = make_titanic_frame(200, seed=0)
+        mock_load_dict.return_value = build_reference_profile(
+            parent_data, parent_data["survived"]
+        )
+        new_data = make_titanic_frame(100, seed=1)
+        new_data["fare"] += 500
+        mock_load_data.return_value = new_data
+        mock_mlflow_client.return_value.get_latest_versions.return_value = [
+            Mock(version="3", run_id="parent_run")
+        ]
+
+        snapshot_path = str(tmp_path / "titanic.csv")
+        make_titanic_frame(200).to_csv(snapshot_path, index=False)
+        with patch("model_training.train") as mock_train:
+            mock_train.return_value = Mock(version="4")
+            retrain_incremental("new.csv", snapshot_path=snapshot_path)
+
+        mock_train.assert_called_once_with(data_url=snapshot_path)
+        mock_client = mock_mlflow_client.return_value
+        mock_client.set_model_version_tag.assert_any_call(
+            REGISTERED_MODEL_NAME, "4", "parent_version", "3"
+        )
+        mock_client.set_model_version_tag.assert_any_call(
+            REGISTERED_MODEL_NAME, "4", "parent_run_id", "parent_run"
+        )
+        mock_client.set_model_version_tag.assert_any_call(
+            REGISTERED_MODEL_NAME, "4", "training_mode", "full_retrain"
+        )
+
+
+class TestLoggingProfile:
+    """Test configurable MLflow logging"""
+
+    @patch("model_training.mlflow.sklearn.autolog")
+    def test_lean_profile_skips_autolog_model(self, mock_autolog):
+        """Test the lean profile leaves model logging to log_model"""
+        configure_autolog("lean")
+        kwargs = mock_autolog.call_args.kwargs
+        assert kwargs["log_models"] is False
+        assert kwargs["log_post_training_metrics"] is False
+
+    @patch("model_training.mlflow.sklearn.autolog")
+    def test_off_profile_disables_autolog(self, mock_autolog):
+        """Test the off profile disables autologging"""
+        configure_autolog("off")
+        mock_autolog.assert_called_once_with(disable=True)
+
+    def test_unknown_profile(self):
+        """Test an unknown profile is rejected"""
+        with pytest.raises(ValueError):
+            configure_autolog("verbose")
+
+    def test_evaluate_model(self):
+        """Test evaluation metrics on a fitted model"""
+        data = make_titanic_frame(200)
+        model = build_model(n_estimators=5).fit(data[TITANIC_FEATURES], data["survived"])
+
+        metrics = evaluate_model(model, data[TITANIC_FEATURES], data["survived"], "train")
+
+        assert set(metrics) == {"train_accuracy", "train_f1", "train_roc_auc"}
+        assert 0 <= metrics["train_accuracy"] <= 1
+
+    @patch("model_training.configure_autolog")
+    @patch("model_training.load_data")
+    @patch("model_training.mlflow.start_run")
+    @patch("model_training.MlflowClient")
+    @patch("model_training.mlflow.sklearn.log_model")
+    def test_train_logs_metrics_and_timings_in_one_batch(
+        self,
+        mock_log_model,
+        mock_mlflow_client,
+        mock_start_run,
+        mock_load_data,
+        mock_configure_autolog,
+    ):
+        """Test evaluation metrics and stage timings are logged in one batch"""
+        mock_load_data.return_value = make_titanic_frame(100)
+        mock_start_run.return_value.__enter__.return_value = Mock(
+            info=Mock(run_id="test_run_id")
+        )
+        mock_client = mock_mlflow_client.return_value
+        mock_client.create_model_version.return_value = Mock(version="1")
+
+        train(logging_profile="lean")
+
+        mock_configure_autolog.assert_called_once_with("lean")
+        mock_client.log_batch.assert_called_once()
+        logged = {
+            metric.key for metric in mock_client.log_batch.call_args.kwargs["metrics"]
+        }
+        assert {"test_accuracy", "fit_seconds", "evaluate_seconds"} <= logged
+        assert {"log_model_seconds", "register_seconds"} <= logged
+
+
 class TestFeatureConfiguration:
     """Test feature configuration"""
 
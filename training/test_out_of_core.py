@@ -0,0 +1,112 @@
+from unittest.mock import Mock, patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmark import make_synthetic_titanic
+from model_training import TITANIC_FEATURES
+from out_of_core import (
+    fit_preprocessor_from_stats,
+    is_test_row,
+    iter_chunks,
+    train_out_of_core,
+    update_reservoir,
+)
+
+
+@pytest.fixture
+def titanic_csv(tmp_path):
+    path = tmp_path / "titanic.csv"
+    make_synthetic_titanic(5000).to_csv(path, index=False)
+    return str(path)
+
+
+class TestHashSplit:
+    """Test the hash-based stratified split"""
+
+    def test_split_is_deterministic_and_stratified(self, titanic_csv):
+        """Test each class is split at the requested fraction, identically per pass"""
+        first = pd.concat(chunk[is_test_row(chunk)] for chunk in iter_chunks(titanic_csv, 700))
+        second = pd.concat(
+            chunk[is_test_row(chunk)] for chunk in iter_chunks(titanic_csv, 1300)
+        )
+        data = pd.concat(iter_chunks(titanic_csv, 5000))
+
+        pd.testing.assert_frame_equal(first, second)
+        for label in (0, 1):
+            share = (first["survived"] == label).sum() / (data["survived"] == label).sum()
+            assert share == pytest.approx(0.2, abs=0.03)
+
+
+class TestStreamingStatistics:
+    """Test statistics gathered in the streaming pass"""
+
+    def test_reservoir_is_bounded_and_uniform(self):
+        """Test the reservoir keeps a fixed number of rows drawn from all chunks"""
+        rng = np.random.default_rng(0)
+        reservoir, seen = None, 0
+        for start in range(0, 10000, 1000):
+            rows = pd.DataFrame({"value": np.arange(start, start + 1000)})
+            reservoir = update_reservoir(reservoir, rows, seen, 500, rng)
+            seen += len(rows)
+
+        assert len(reservoir) == 500
+        assert reservoir["value"].is_unique
+        assert reservoir["value"].mean() == pytest.approx(5000, rel=0.1)
+
+    def test_preprocessor_from_stats(self):
+        """Test the imputers and encoder learn the streamed statistics"""
+        medians = {"age": 28.0, "sibsp": 0.0, "parch": 0.0, "fare": 14.5}
+        category_counts = {
+            "pclass": {1: 10, 2: 5, 3: 40},
+            "sex": {"male": 30, "female": 25},
+            "embarked": {"S": 40, "C": 10, "Q": 5},
+        }
+
+        preprocessor = fit_preprocessor_from_stats(medians, category_counts)
+
+        numeric_imputer = preprocessor.named_transformers_["num"].named_steps["imputer"]
+        assert list(numeric_imputer.statistics_) == [28.0, 0.0, 0.0, 14.5]
+        categorical = preprocessor.named_transformers_["cat"]
+        assert list(categorical.named_steps["imputer"].statistics_) == [3, "male", "S"]
+        encoder_categories = categorical.named_steps["encoder"].categories_
+        assert [list(values) for values in encoder_categories] == [
+            [1, 2, 3],
+            ["female", "male"],
+            ["C", "Q", "S"],
+        ]
+
+
+class TestOutOfCoreTraining:
+    """Test the chunked training pipeline"""
+
+    @patch("out_of_core.MlflowClient")
+    @patch("out_of_core.log_and_register")
+    @patch("out_of_core.mlflow")
+    def test_train_out_of_core(
+        self, mock_mlflow, mock_log_and_register, mock_mlflow_client, titanic_csv
+    ):
+        """Test a forest assembled from chunks is evaluated and registered"""
+        mock_mlflow.start_run.return_value.__enter__.return_value = Mock(
+            info=Mock(run_id="test_run_id")
+        )
+
+        train_out_of_core(
+            data_url=titanic_csv, chunksize=500, n_estimators=6, sample_size=300
+        )
+
+        run, model, X_sample, y_sample = mock_log_and_register.call_args[0][:4]
+        assert model.named_steps["classifier"].n_estimators == 6
+        assert len(model.named_steps["classifier"].estimators_) == 6
+        assert len(X_sample) == 300
+        assert list(X_sample.columns) == TITANIC_FEATURES
+        assert set(model.predict(X_sample)) <= {0, 1}
+
+        params = mock_mlflow.log_params.call_args[0][0]
+        assert params["n_chunks"] == 10
+        metrics = {
+            metric.key: metric.value
+            for metric in mock_mlflow_client.return_value.log_batch.call_args.kwargs["metrics"]
+        }
+        assert metrics["test_accuracy"] > 0.6